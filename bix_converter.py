@@ -358,8 +358,7 @@ def convert_bix_to_gltf(input_path, output_path=None):
     elif os.path.isfile(input_path) and input_path.lower().endswith('.bix'):
         process_bix_file(input_path, output_path)
     else:
-        print(f"Error: {input_path} is not a valid .bix file or directory")
-        sys.exit(1)
+        raise ValueError(f"{input_path} is not a valid .bix file or directory")
 
 def convert_gltf_to_bix(input_path, output_path=None):
     if os.path.isdir(input_path):
@@ -367,8 +366,7 @@ def convert_gltf_to_bix(input_path, output_path=None):
     elif os.path.isfile(input_path) and input_path.lower().endswith('.gltf'):
         process_gltf_file(input_path, output_path)
     else:
-        print(f"Error: {input_path} is not a valid .gltf file or directory")
-        sys.exit(1)
+        raise ValueError(f"{input_path} is not a valid .gltf file or directory")
 
 def process_bix_file(input_path, output_path=None):
     if output_path is None:
@@ -426,11 +424,15 @@ if __name__ == "__main__":
     input_path = sys.argv[2]
     output_path = sys.argv[3] if len(sys.argv) > 3 else None
     
-    if direction == "--bix-to-gltf":
-        convert_bix_to_gltf(input_path, output_path)
-    elif direction == "--gltf-to-bix":
-        convert_gltf_to_bix(input_path, output_path)
-    else:
-        print("Error: First argument must be either --bix-to-gltf or --gltf-to-bix")
-        print_usage()
+    try:
+        if direction == "--bix-to-gltf":
+            convert_bix_to_gltf(input_path, output_path)
+        elif direction == "--gltf-to-bix":
+            convert_gltf_to_bix(input_path, output_path)
+        else:
+            print("Error: First argument must be either --bix-to-gltf or --gltf-to-bix")
+            print_usage()
+            sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,176 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+
+from dat_index import hash_file
+
+# where the converted files get kept between runs, next to the scripts like the blowfish tables
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conversion_cache")
+DEFAULT_MAX_BYTES = 1 << 30
+
+META_FILE = "meta.json"
+
+@functools.lru_cache(maxsize=None)
+def converter_version(*parts):
+    """
+    Version tag for a converter, changes whenever one of its parts does
+    :param parts: Files (hashed by content, e.g. the converter script) and plain strings (e.g. command line options)
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if os.path.isfile(part):
+            hasher.update(hash_file(part).encode())
+        else:
+            hasher.update(str(part).encode())
+        hasher.update(b'\x00')
+    return hasher.hexdigest()
+
+class ConversionCache:
+    """
+    Converted files keyed by the hash of the source file plus the converter name and version
+    :param cache_dir: Folder the entries are kept in
+    :param max_bytes: Size the cache gets trimmed down to, least recently used entries go first
+    :param link: Hardlink entries in and out of the cache instead of copying them. Faster, but editing one of
+    the linked outputs in place also edits every other copy of it (the cache itself notices and drops the entry)
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, link=False):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for_file(self, source_path, converter, version):
+        key_hash = hashlib.blake2b(digest_size=16)
+        key_hash.update(f"{converter}\x00{version}\x00{hash_file(source_path)}".encode())
+        return key_hash.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _place(self, src, dst):
+        # whatever was at dst goes away first, so a link never ends up writing through to an old inode
+        if os.path.lexists(dst):
+            os.remove(dst)
+        if self.link:
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
+                # different filesystem or no hardlinks there
+                pass
+        shutil.copyfile(src, dst)
+
+    def _load_meta(self, entry_dir):
+        try:
+            with open(os.path.join(entry_dir, META_FILE), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_intact(self, entry_dir, meta):
+        for stored in meta["files"]:
+            try:
+                st = os.stat(os.path.join(entry_dir, stored["file"]))
+            except OSError:
+                return False
+            # a hardlinked output that got edited in place changes the cached file too
+            if st.st_size != stored["size"] or st.st_mtime_ns != stored["mtime_ns"]:
+                return False
+        return True
+
+    def fetch(self, key, dest_prefix):
+        """
+        Put a cached conversion in place
+        :param dest_prefix: Output path every stored suffix gets appended to
+        :return: List of written files, or None on a miss
+        """
+        entry_dir = self._entry_dir(key)
+        meta = self._load_meta(entry_dir)
+        if meta is None or not self._is_intact(entry_dir, meta):
+            if meta is not None:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            self.misses += 1
+            return None
+
+        written = []
+        try:
+            os.makedirs(os.path.dirname(dest_prefix) or '.', exist_ok=True)
+            for stored in meta["files"]:
+                dst = dest_prefix + stored["suffix"]
+                self._place(os.path.join(entry_dir, stored["file"]), dst)
+                written.append(dst)
+        except OSError:
+            # evicted by another process halfway through, don't leave half an output behind
+            for dst in written:
+                if os.path.exists(dst):
+                    os.remove(dst)
+            self.misses += 1
+            return None
+
+        # bump it to the front of the LRU
+        try:
+            os.utime(os.path.join(entry_dir, META_FILE))
+        except OSError:
+            pass
+        self.hits += 1
+        return written
+
+    def store(self, key, dest_prefix, outputs):
+        """Keep the outputs of a conversion, stored by their suffix after dest_prefix"""
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(entry_dir):
+            return
+
+        # build the entry off to the side and rename it in, so other processes never see half of it
+        temp_dir = os.path.join(self.cache_dir, "tmp", f"{key}.{os.getpid()}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        try:
+            files = []
+            for i, path in enumerate(sorted(outputs)):
+                stored_file = str(i)
+                self._place(path, os.path.join(temp_dir, stored_file))
+                st = os.stat(os.path.join(temp_dir, stored_file))
+                files.append({"file": stored_file, "suffix": path[len(dest_prefix):],
+                              "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+            with open(os.path.join(temp_dir, META_FILE), 'w') as f:
+                json.dump({"files": files}, f)
+
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            # someone else stored the same thing first
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def trim(self):
+        """Drop least recently used entries until the cache fits in max_bytes, returns how many went"""
+        entries = []
+        total = 0
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir() or shard.name == "tmp":
+                continue
+            for entry in os.scandir(shard.path):
+                meta = self._load_meta(entry.path)
+                if meta is None:
+                    continue
+                size = sum(stored["size"] for stored in meta["files"])
+                try:
+                    last_used = os.stat(os.path.join(entry.path, META_FILE)).st_mtime_ns
+                except OSError:
+                    continue
+                entries.append((last_used, size, entry.path))
+                total += size
+
+        removed = 0
+        for last_used, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
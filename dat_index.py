@@ -0,0 +1,150 @@
+import struct
+import argparse
+import hashlib
+import json
+import mmap
+import os
+
+ENTRY_SIZE = 32
+
+# fname_len, fname_off, unknown, file_content_len, file_content_off, unknown, word6, word7
+ENTRY_STRUCT = struct.Struct('<8i')
+
+class DatEntry:
+    def __init__(self, index, name, fname_off, fname_len, offset, length, word6, word7):
+        self.index = index
+        self.name = name
+        self.fname_off = fname_off
+        self.fname_len = fname_len
+        self.offset = offset
+        self.length = length
+        self.word6 = word6
+        self.word7 = word7
+
+class DatIndex:
+    """
+    Name -> entry index over a .dat, backed by an mmap of the file (or any buffer already in memory)
+    :param source: Path to a .dat file, or a bytes-like object holding one
+    """
+
+    def __init__(self, source):
+        self._mmap = None
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    raise ValueError(f"{source} is empty")
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._buf = memoryview(self._mmap)
+        else:
+            self._buf = memoryview(source).cast('B')
+
+        try:
+            self._read_entries()
+        except Exception:
+            # nobody gets to close an index that never finished opening
+            self.close()
+            raise
+
+    def _read_entries(self):
+        # the first filename sits right after the header table, so its offset is the table length
+        header_len = struct.unpack_from('<i', self._buf, 4)[0]
+        header_len -= header_len % ENTRY_SIZE
+        if header_len <= 0 or header_len > len(self._buf):
+            raise ValueError("this doesn't look like a .dat file")
+        self.header_len = header_len
+
+        self.entries = []
+        self.by_name = {}
+        for i, fields in enumerate(ENTRY_STRUCT.iter_unpack(self._buf[:header_len])):
+            fname_len, fname_off, _, length, offset, _, word6, word7 = fields
+            name = bytes(self._buf[fname_off:fname_off+fname_len]).decode('unicode_escape')[:-1]
+            entry = DatEntry(i, name, fname_off, fname_len, offset, length, word6, word7)
+            self.entries.append(entry)
+            self.by_name[name] = entry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def __getitem__(self, name):
+        return self.by_name[name]
+
+    def names(self):
+        """Entry names in the order they're stored in"""
+        return [entry.name for entry in self.entries]
+
+    def payload(self, entry):
+        """Zero-copy view of an entry's contents, takes an entry or a name"""
+        if not isinstance(entry, DatEntry):
+            entry = self.by_name[entry]
+        return self._buf[entry.offset:entry.offset+entry.length]
+
+    def close(self):
+        if self._mmap is not None:
+            self._buf.release()
+            try:
+                self._mmap.close()
+            except BufferError:
+                # someone is still holding a payload view, the mmap goes away with it
+                pass
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def content_hash(data):
+    """Hash of an entry's contents, as stored in the extraction manifest"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def hash_file(path, chunk_size=1 << 20):
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def load_manifest(manifest_path):
+    """Load the name -> {hash, size, mtime_ns} records written at extraction time"""
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest_path, manifest):
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+def main():
+    parser = argparse.ArgumentParser(description='List the entries of a .dat, or pull single ones out of it')
+    parser.add_argument('input_file', help='Path to the .dat file')
+    parser.add_argument('names', nargs='*', help='Entries to extract (default: just list everything)')
+    parser.add_argument('-o', '--output', help='Output directory for extracted entries (default: current directory)', default='.')
+
+    args = parser.parse_args()
+
+    with DatIndex(args.input_file) as index:
+        if not args.names:
+            for entry in index:
+                print(f"{entry.name}\t{entry.length}\t{entry.offset}")
+            return
+
+        os.makedirs(args.output, exist_ok=True)
+        for name in args.names:
+            if name not in index:
+                print(f"no entry named {name}")
+                continue
+            with open(os.path.join(args.output, name), 'wb') as f:
+                f.write(index.payload(name))
+            print(f'{name} written')
+
+if __name__ == '__main__':
+    main()
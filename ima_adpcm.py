@@ -0,0 +1,306 @@
+import numpy as np
+import argparse
+import os
+import struct
+import wave
+
+# the .adp files are headerless 4-bit IMA ADPCM, mono at 8 kHz, same as sox -t ima -r 8000 -e ima-adpcm
+SAMPLE_RATE = 8000
+
+STEP_TABLE = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230, 253, 279, 307,
+    337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066,
+    2272, 2499, 2749, 3024, 3327, 3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487, 12635, 13899,
+    15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767,
+], dtype=np.int32)
+INDEX_CHANGES = (-1, -1, -1, -1, 2, 4, 6, 8)
+MAX_INDEX = len(STEP_TABLE) - 1
+
+SAMPLE_MIN = -32768
+SAMPLE_MAX = 32767
+
+# next step index for every (step index, code) pair, so the only per-sample work left in python is a lookup
+NEXT_INDEX = [[min(max(index + INDEX_CHANGES[code & 7], 0), MAX_INDEX) for code in range(16)] for index in range(MAX_INDEX + 1)]
+
+# how many samples get their clamping sorted out at once when decoding
+DECODE_BLOCK = 4096
+CHUNK_SIZE = 1 << 16
+
+def code_diffs(codes, indexes):
+    """Signed sample difference for every code, given the step index it was decoded with"""
+    codes = codes.astype(np.int32)
+    diffs = (STEP_TABLE[indexes] * ((codes & 7) * 2 + 1)) >> 3
+    return np.where(codes & 8, -diffs, diffs)
+
+def clamped_cumsum(start, diffs):
+    """Running sum of diffs from start, clamped to 16 bits after every step, same as adding them one at a time"""
+    # every step is x -> min(max(x + diff, lo), hi), and two of those in a row are again one of those,
+    # so the prefixes can be built by doubling: after each pass every step covers twice as many samples
+    add = diffs.astype(np.int64)
+    lo = np.full(len(add), SAMPLE_MIN, dtype=np.int64)
+    hi = np.full(len(add), SAMPLE_MAX, dtype=np.int64)
+    shift = 1
+    while shift < len(add):
+        # the prefix ending shift samples earlier goes first, then this one
+        new_lo = np.clip(lo[:-shift] + add[shift:], lo[shift:], hi[shift:])
+        new_hi = np.clip(hi[:-shift] + add[shift:], lo[shift:], hi[shift:])
+        add[shift:] = add[:-shift] + add[shift:]
+        lo[shift:] = new_lo
+        hi[shift:] = new_hi
+        shift *= 2
+    return np.minimum(np.maximum(start + add, lo), hi)
+
+class ImaAdpcmDecoder:
+    """Streaming .adp decoder, feed it the file in chunks of any size"""
+
+    def __init__(self):
+        self.sample = 0
+        self.index = 0
+
+    def _step_indexes(self, codes):
+        # the step index only depends on the codes, not on the samples, but every one depends on the one before
+        indexes = bytearray(len(codes))
+        index = self.index
+        for i, code in enumerate(codes.tolist()):
+            indexes[i] = index
+            index = NEXT_INDEX[index][code]
+        self.index = index
+        return np.frombuffer(indexes, dtype=np.uint8)
+
+    def decode(self, data):
+        """Decode a chunk of .adp bytes, two samples per byte with the high nibble first"""
+        raw = np.frombuffer(data, dtype=np.uint8)
+        codes = np.empty(len(raw) * 2, dtype=np.uint8)
+        codes[0::2] = raw >> 4
+        codes[1::2] = raw & 0x0F
+
+        diffs = code_diffs(codes, self._step_indexes(codes))
+
+        out = np.empty(len(codes), dtype=np.int16)
+        for start in range(0, len(diffs), DECODE_BLOCK):
+            samples = self.sample + np.cumsum(diffs[start:start + DECODE_BLOCK], dtype=np.int64)
+            # a sample that goes past 16 bits gets clamped, and everything after it starts from the clamped value
+            if samples.min() < SAMPLE_MIN or samples.max() > SAMPLE_MAX:
+                samples = clamped_cumsum(self.sample, diffs[start:start + DECODE_BLOCK])
+            out[start:start + len(samples)] = samples
+            self.sample = int(samples[-1])
+        return out
+
+class ImaAdpcmEncoder:
+    """Streaming .adp encoder, feed it 16-bit mono samples at 8 kHz in chunks of any size"""
+
+    def __init__(self):
+        self.sample = 0
+        self.index = 0
+        self._pending = None
+
+    def encode(self, samples):
+        """Encode a chunk of samples, returns the whole bytes done so far (an odd sample waits for the next chunk)"""
+        steps = STEP_TABLE.tolist()
+        sample, index = self.sample, self.index
+
+        codes = bytearray(len(samples))
+        for i, target in enumerate(np.asarray(samples, dtype=np.int64).tolist()):
+            step = steps[index]
+            delta = target - sample
+            code = 0
+            if delta < 0:
+                code = 8
+                delta = -delta
+            magnitude = min(delta * 4 // step, 7)
+            code |= magnitude
+
+            # run the decoder on the code so both sides stay in step
+            diff = (step * (magnitude * 2 + 1)) >> 3
+            sample = sample - diff if code & 8 else sample + diff
+            sample = min(max(sample, SAMPLE_MIN), SAMPLE_MAX)
+            index = NEXT_INDEX[index][code]
+            codes[i] = code
+
+        self.sample, self.index = sample, index
+
+        codes = np.frombuffer(codes, dtype=np.uint8)
+        if self._pending is not None:
+            codes = np.concatenate([np.array([self._pending], dtype=np.uint8), codes])
+            self._pending = None
+        if len(codes) % 2:
+            self._pending = int(codes[-1])
+            codes = codes[:-1]
+        return ((codes[0::2] << 4) | codes[1::2]).astype(np.uint8).tobytes()
+
+    def flush(self):
+        """The last odd sample, padded with a zero nibble"""
+        if self._pending is None:
+            return b''
+        out = bytes([self._pending << 4])
+        self._pending = None
+        return out
+
+def decode(data):
+    """Decode a whole .adp in one go"""
+    return ImaAdpcmDecoder().decode(data)
+
+def encode(samples):
+    """Encode 16-bit mono 8 kHz samples into a whole .adp in one go"""
+    encoder = ImaAdpcmEncoder()
+    return encoder.encode(samples) + encoder.flush()
+
+def read_wav_chunks(wav_path, chunk_frames=CHUNK_SIZE):
+    """
+    Read a .wav as mono samples, in chunks
+    :return: (sample rate, generator of float64 sample arrays in the 16-bit range)
+    """
+    f = open(wav_path, 'rb')
+    try:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError(f"{wav_path} is not a .wav file")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{wav_path} has no audio data")
+            chunk_id, chunk_len = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_len + (chunk_len & 1))
+            elif chunk_id == b'data':
+                break
+            else:
+                f.seek(chunk_len + (chunk_len & 1), os.SEEK_CUR)
+        if fmt is None:
+            raise ValueError(f"{wav_path} has no fmt chunk")
+    except Exception:
+        f.close()
+        raise
+
+    if len(fmt) < 16:
+        f.close()
+        raise ValueError(f"{wav_path} has a fmt chunk that's too short")
+    format_tag, channels, rate, _, block_align, bits = struct.unpack_from('<HHIIHH', fmt)
+    if format_tag == 0xFFFE:
+        # WAVE_FORMAT_EXTENSIBLE, the real format is the start of the sub-format GUID
+        format_tag = struct.unpack_from('<H', fmt, 24)[0]
+    if format_tag not in (1, 3) or (format_tag == 3 and bits not in (32, 64)) or (format_tag == 1 and bits not in (8, 16, 24, 32)):
+        f.close()
+        raise ValueError(f"{wav_path} uses an unsupported format ({format_tag}, {bits} bits)")
+    # the frame size is what everything below divides by, it has to match the format
+    if channels == 0 or block_align != channels * (bits // 8):
+        f.close()
+        raise ValueError(f"{wav_path} has a broken fmt chunk ({channels} channels, {block_align} bytes per frame, {bits} bits)")
+
+    def chunks():
+        with f:
+            remaining = chunk_len - chunk_len % block_align
+            while remaining > 0:
+                data = f.read(min(chunk_frames * block_align, remaining))
+                data = data[:len(data) - len(data) % block_align]
+                if not data:
+                    break
+                remaining -= len(data)
+
+                if format_tag == 3:
+                    frames = np.frombuffer(data, dtype='<f4' if bits == 32 else '<f8') * 32768.0
+                elif bits == 8:
+                    frames = (np.frombuffer(data, dtype=np.uint8).astype(np.float64) - 128) * 256
+                elif bits == 24:
+                    raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+                    # sample << 8 in an int32, down to the 16-bit range like the 32-bit ones
+                    frames = ((raw[:, 0] << 8) | (raw[:, 1] << 16) | (raw[:, 2] << 24)) / 65536.0
+                else:
+                    frames = np.frombuffer(data, dtype='<i2' if bits == 16 else '<i4').astype(np.float64)
+                    if bits == 32:
+                        frames /= 65536.0
+
+                # downmix to mono
+                yield frames.reshape(-1, channels).mean(axis=1)
+
+    return rate, chunks()
+
+def to_int16(samples):
+    return np.clip(np.round(samples), SAMPLE_MIN, SAMPLE_MAX).astype(np.int16)
+
+def resample(samples, rate, target_rate=SAMPLE_RATE):
+    """Linear resampling, good enough for 8 kHz game audio"""
+    if rate == target_rate or not len(samples):
+        return samples
+    count = max(1, int(round(len(samples) * target_rate / rate)))
+    positions = np.arange(count) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples)
+
+def adp_to_wav(adp_path, wav_path, chunk_size=CHUNK_SIZE):
+    """Decode an .adp into a 16-bit mono 8 kHz .wav, a chunk at a time"""
+    decoder = ImaAdpcmDecoder()
+    with open(adp_path, 'rb') as in_f, wave.open(wav_path, 'wb') as out_f:
+        out_f.setnchannels(1)
+        out_f.setsampwidth(2)
+        out_f.setframerate(SAMPLE_RATE)
+        while True:
+            data = in_f.read(chunk_size)
+            if not data:
+                break
+            out_f.writeframes(decoder.decode(data).astype('<i2').tobytes())
+    return wav_path
+
+def wav_to_adp(wav_path, adp_path, chunk_frames=CHUNK_SIZE):
+    """Encode a .wav into an .adp, downmixed to mono and resampled to 8 kHz if it isn't already"""
+    rate, chunks = read_wav_chunks(wav_path, chunk_frames)
+    if rate != SAMPLE_RATE:
+        # the resampling needs the whole thing
+        chunks = [resample(np.concatenate(list(chunks) or [np.zeros(0)]), rate)]
+
+    encoder = ImaAdpcmEncoder()
+    with open(adp_path, 'wb') as out_f:
+        for samples in chunks:
+            out_f.write(encoder.encode(to_int16(samples)))
+        out_f.write(encoder.flush())
+    return adp_path
+
+def convert_files(pairs, to_wav=True):
+    """
+    Convert a whole list of files in one call
+    :param pairs: (input path, output path) pairs
+    :return: (input path, error message or None) for each pair, in order
+    """
+    convert = adp_to_wav if to_wav else wav_to_adp
+    results = []
+    for input_path, output_path in pairs:
+        try:
+            convert(input_path, output_path)
+            results.append((input_path, None))
+        except (ValueError, OSError, EOFError, struct.error, wave.Error) as e:
+            results.append((input_path, str(e)))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert .adp sounds to .wav and back, without sox')
+    parser.add_argument('inputs', nargs='+', help='Input .adp files (or .wav files with -e), or directories of them')
+    parser.add_argument('-e', '--encode', action='store_true', help='Encode .wav files to .adp instead')
+    parser.add_argument('-o', '--output', help='Output directory (default: next to each input)')
+
+    args = parser.parse_args()
+
+    extension, out_extension = ('.wav', '.adp') if args.encode else ('.adp', '.wav')
+    input_files = []
+    for input_path in args.inputs:
+        if os.path.isdir(input_path):
+            input_files += sorted(os.path.join(input_path, f) for f in os.listdir(input_path) if f.lower().endswith(extension))
+        else:
+            input_files.append(input_path)
+
+    pairs = []
+    for input_file in input_files:
+        out_dir = args.output or os.path.dirname(input_file)
+        pairs.append((input_file, os.path.join(out_dir, os.path.splitext(os.path.basename(input_file))[0] + out_extension)))
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    for (input_file, output_file), (_, error) in zip(pairs, convert_files(pairs, not args.encode)):
+        if error:
+            print(f"Error converting {input_file}: {error}")
+        else:
+            print(f"Converted {input_file} to {output_file}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import zlib
+import argparse
+
+# the zlib stream inside a decrypted .pak always starts right after this header
+PAK_HEADER_LEN = 0x35
+PAD_BYTE = b'\xCD'
+CHUNK_SIZE = 1 << 20
+
+def inflate_chunks(chunks):
+    """Inflate a zlib stream fed as an iterable of byte chunks, stops at the end of the stream"""
+    inflater = zlib.decompressobj()
+    for chunk in chunks:
+        out = inflater.decompress(chunk)
+        if out:
+            yield out
+        if inflater.eof:
+            break
+    else:
+        out = inflater.flush()
+        if out:
+            yield out
+        if not inflater.eof:
+            raise zlib.error("zlib stream ended early")
+
+def deflate_chunks(chunks, level=9):
+    """Deflate an iterable of byte chunks into a single zlib stream"""
+    deflater = zlib.compressobj(level)
+    for chunk in chunks:
+        out = deflater.compress(chunk)
+        if out:
+            yield out
+    yield deflater.flush()
+
+def read_file_chunks(f, chunk_size=CHUNK_SIZE):
+    """Yield a file object's contents in fixed-size chunks"""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+def padding_for(size):
+    """0xCD padding needed to get the .pak to a dword boundary"""
+    return PAD_BYTE * ((8 - (size % 8)) % 8)
+
+def split_header(chunks):
+    """Pull the 0x35 byte .pak header off a stream of chunks, returns (header, rest of the chunks)"""
+    chunks = iter(chunks)
+    header = b''
+    for chunk in chunks:
+        header += bytes(chunk)
+        if len(header) >= PAK_HEADER_LEN:
+            break
+    if len(header) < PAK_HEADER_LEN:
+        raise ValueError("the .pak is too short to have a header")
+
+    def rest():
+        if len(header) > PAK_HEADER_LEN:
+            yield header[PAK_HEADER_LEN:]
+        yield from chunks
+
+    return header[:PAK_HEADER_LEN], rest()
+
+def pak_chunks(header, dat_chunks, level=9):
+    """Build a whole .pak as chunks: the header, the deflated .dat and the 0xCD padding"""
+    yield header
+    size = len(header)
+    for out in deflate_chunks(dat_chunks, level):
+        size += len(out)
+        yield out
+    yield padding_for(size)
+
+def extract_dat(pak_file, dat_file):
+    """Inflate the .dat stored at offset 0x35 of a decrypted .pak"""
+    with open(pak_file, 'rb') as in_f, open(dat_file, 'wb') as out_f:
+        in_f.seek(PAK_HEADER_LEN)
+        for out in inflate_chunks(read_file_chunks(in_f)):
+            out_f.write(out)
+    return dat_file
+
+def pack_dat(dat_file, pak_file, original_pak, level=9):
+    """Deflate a .dat behind the header of the original .pak and pad it with 0xCD"""
+    with open(original_pak, 'rb') as f:
+        header = f.read(PAK_HEADER_LEN)
+    if len(header) != PAK_HEADER_LEN:
+        raise ValueError(f"{original_pak} is too short to have a .pak header")
+
+    with open(dat_file, 'rb') as in_f, open(pak_file, 'wb') as out_f:
+        for out in pak_chunks(header, read_file_chunks(in_f), level):
+            out_f.write(out)
+    return pak_file
+
+def main():
+    parser = argparse.ArgumentParser(description='Inflate the .dat out of a decrypted .pak, or deflate one back in')
+    parser.add_argument('input_file', help='Input .pak (extract) or .dat (pack) file')
+    parser.add_argument('output_file', help='Output .dat (extract) or .pak (pack) file')
+    parser.add_argument('-p', '--pack', metavar='ORIGINAL_PAK', help='Pack the input .dat, taking the header from this original .pak')
+
+    args = parser.parse_args()
+
+    try:
+        if args.pack:
+            pack_dat(args.input_file, args.output_file, args.pack)
+        else:
+            extract_dat(args.input_file, args.output_file)
+    except (zlib.error, ValueError, OSError) as e:
+        print(f"Error: {e}")
+        return
+    print(f"wrote {args.output_file}")
+
+if __name__ == '__main__':
+    main()
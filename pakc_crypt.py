@@ -0,0 +1,255 @@
+import numpy as np
+import argparse
+import functools
+import os
+
+# the game's blowfish tables, dumped straight out of the binary (little-endian dwords)
+P_ARRAY_FILE = "P_ARRAY_7F4D0.bin"
+S_BOXES_FILE = "S_BOXES_7F518.bin"
+
+# bytes 4-8 of every decrypted .pak
+PAK_MAGIC = b'\xF7\xD3\x1F\x10'
+
+PREDEFINED_KEYS = {
+    1: ("asefcsee", "6r45-zz01.pakc"),
+    2: ("sddfcer4", "6r45-zz02.pakc"),
+    3: ("3434frdc", "6r45-zz03.pakc"),
+    4: ("fvbtgrsf", "6r45-zz04.pakc"),
+    5: ("34fgrfgf", "6r45-zz05.pakc"),
+}
+
+BLOCK_SIZE = 8
+MAX_KEY_LEN = 56
+
+# how many blocks get pushed through numpy at once, keeps the temporaries at a few MB
+CHUNK_BLOCKS = 1 << 16
+
+_tables = None
+
+def load_tables(table_dir=None):
+    """Load the P-array and S-boxes shipped next to this script"""
+    global _tables
+    if table_dir is None:
+        if _tables is not None:
+            return _tables
+        table_dir = os.path.dirname(os.path.abspath(__file__))
+
+    p_array = np.fromfile(os.path.join(table_dir, P_ARRAY_FILE), dtype='<u4')
+    s_boxes = np.fromfile(os.path.join(table_dir, S_BOXES_FILE), dtype='<u4')
+    if len(p_array) != 18 or len(s_boxes) != 1024:
+        raise ValueError("the P_ARRAY/S_BOXES tables are the wrong size")
+
+    tables = (p_array.tolist(), s_boxes.reshape(4, 256).tolist())
+    if table_dir == os.path.dirname(os.path.abspath(__file__)):
+        _tables = tables
+    return tables
+
+def resolve_key(key=None, key_file=None, key_num=None):
+    """Turn the -k/-kf/-n options into raw key bytes, same priority as decrypt_pakc.exe"""
+    if key:
+        return key.encode('latin-1') if isinstance(key, str) else bytes(key)
+    if key_file:
+        with open(key_file, 'rb') as f:
+            # the exe reads the key file in text mode and stops at the first null
+            return f.read().replace(b'\r\n', b'\n').split(b'\x00')[0]
+    if key_num:
+        if key_num not in PREDEFINED_KEYS:
+            raise ValueError("predefined key number must be between 1 and 5")
+        return PREDEFINED_KEYS[key_num][0].encode('latin-1')
+    raise ValueError("no key specified! Use -k, -kf or -n")
+
+class PakcCipher:
+    """Blowfish (ECB, big-endian halves) keyed the same way as decrypt_pakc.exe"""
+
+    def __init__(self, key: bytes, table_dir=None):
+        key = key[:MAX_KEY_LEN]
+        if not key:
+            raise ValueError("key cannot be empty")
+
+        p_init, s_init = load_tables(table_dir)
+        self.p = list(p_init)
+        self.s = [list(box) for box in s_init]
+
+        # fold the key into the P-array, cycling over the key bytes
+        key_pos = 0
+        for i in range(18):
+            word = 0
+            for _ in range(4):
+                word = (word << 8) | key[key_pos]
+                key_pos = (key_pos + 1) % len(key)
+            self.p[i] ^= word
+
+        left = right = 0
+        for i in range(0, 18, 2):
+            left, right = self._encrypt_block(left, right)
+            self.p[i], self.p[i + 1] = left, right
+        for box in self.s:
+            for i in range(0, 256, 2):
+                left, right = self._encrypt_block(left, right)
+                box[i], box[i + 1] = left, right
+
+        self._p_enc = np.array(self.p, dtype=np.uint32)
+        self._p_dec = self._p_enc[::-1].copy()
+        self._s = np.array(self.s, dtype=np.uint32)
+
+    def _encrypt_block(self, left, right):
+        # scalar version, only used for the key schedule
+        p, s0, s1, s2, s3 = self.p, self.s[0], self.s[1], self.s[2], self.s[3]
+        for i in range(16):
+            left ^= p[i]
+            f = ((s0[left >> 24] + s1[(left >> 16) & 0xFF]) & 0xFFFFFFFF) ^ s2[(left >> 8) & 0xFF]
+            right ^= (f + s3[left & 0xFF]) & 0xFFFFFFFF
+            left, right = right, left
+        left, right = right, left
+        right ^= p[16]
+        left ^= p[17]
+        return left, right
+
+    def _crypt_blocks(self, buf, p):
+        # every block of the chunk goes through each round together
+        words = np.frombuffer(buf, dtype='>u4')
+        left = words[0::2].astype(np.uint32)
+        right = words[1::2].astype(np.uint32)
+        s0, s1, s2, s3 = self._s
+
+        for i in range(16):
+            left ^= p[i]
+            right ^= ((s0[left >> 24] + s1[(left >> 16) & 0xFF]) ^ s2[(left >> 8) & 0xFF]) + s3[left & 0xFF]
+            left, right = right, left
+        left, right = right, left
+        right ^= p[16]
+        left ^= p[17]
+
+        out = np.empty(len(words), dtype='>u4')
+        out[0::2] = left
+        out[1::2] = right
+        return out.tobytes()
+
+    def _crypt(self, data, p):
+        data = memoryview(data).cast('B')
+        whole = len(data) - len(data) % BLOCK_SIZE
+        step = CHUNK_BLOCKS * BLOCK_SIZE
+
+        out = bytearray(len(data))
+        for start in range(0, whole, step):
+            end = min(start + step, whole)
+            out[start:end] = self._crypt_blocks(data[start:end], p)
+
+        # trailing bytes that don't fill a block are left alone, like the exe does
+        out[whole:] = data[whole:]
+        return bytes(out)
+
+    def _crypt_chunks(self, chunks, p):
+        # carry the bytes that don't fill a block over to the next chunk
+        pending = b''
+        for chunk in chunks:
+            if pending:
+                chunk = pending + bytes(chunk)
+            whole = len(chunk) - len(chunk) % BLOCK_SIZE
+            if whole:
+                yield self._crypt(memoryview(chunk)[:whole], p)
+            pending = bytes(chunk[whole:])
+        if pending:
+            yield pending
+
+    def decrypt(self, data):
+        return self._crypt(data, self._p_dec)
+
+    def encrypt(self, data):
+        return self._crypt(data, self._p_enc)
+
+    def decrypt_chunks(self, chunks):
+        """Decrypt an iterable of byte chunks of any size"""
+        return self._crypt_chunks(chunks, self._p_dec)
+
+    def encrypt_chunks(self, chunks):
+        """Encrypt an iterable of byte chunks of any size"""
+        return self._crypt_chunks(chunks, self._p_enc)
+
+@functools.lru_cache(maxsize=None)
+def cipher_for_key_num(key_num):
+    """PakcCipher for one of the built-in keys, the key schedule only runs once per key"""
+    return PakcCipher(resolve_key(key_num=key_num))
+
+def detect_key_num(data):
+    """
+    Find which built-in key a .pakc uses by trial-decrypting just two of its blocks
+    :param data: At least the first 0x38 bytes of the .pakc
+    :return: The key number, or None if none of them fit
+    """
+    # block 0 has the F7 D3 1F 10 marker, block 6 has the zlib header at 0x35
+    probe = bytes(data[0:8]) + bytes(data[0x30:0x38])
+    if len(probe) != 16:
+        return None
+
+    for key_num in PREDEFINED_KEYS:
+        plain = cipher_for_key_num(key_num).decrypt(probe)
+        cmf, flg = plain[8 + 5], plain[8 + 6]
+        if plain[4:8] == PAK_MAGIC and cmf & 0x0F == 8 and ((cmf << 8) | flg) % 31 == 0:
+            return key_num
+    return None
+
+def detect_key_num_for_file(pakc_file):
+    with open(pakc_file, 'rb') as f:
+        return detect_key_num(f.read(0x38))
+
+def has_pak_header(data):
+    """Check for the F7 D3 1F 10 marker in a decrypted .pak"""
+    return bytes(data[4:8]) == PAK_MAGIC
+
+def crypt_file(input_file, output_file, decrypt=True, key=None, key_file=None, key_num=None):
+    """Decrypt or encrypt a whole file in one go"""
+    cipher = PakcCipher(resolve_key(key, key_file, key_num))
+    with open(input_file, 'rb') as f:
+        data = f.read()
+
+    out = cipher.decrypt(data) if decrypt else cipher.encrypt(data)
+
+    with open(output_file, 'wb') as f:
+        f.write(out)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description='Decrypt/encrypt .pakc files without decrypt_pakc.exe')
+    parser.add_argument('-i', '--input', required=True, help='Input file to process')
+    parser.add_argument('-o', '--output', help='Output file')
+    parser.add_argument('-k', '--key', help='Encryption/decryption key (string)')
+    parser.add_argument('-kf', '--key-file', help='Read key from file')
+    parser.add_argument('-n', '--key-num', type=int, choices=range(1, 6),
+                        help='Use predefined key number (1-5)')
+    parser.add_argument('-a', '--auto-key', action='store_true',
+                        help='Find the right predefined key by trial-decrypting the start of the file (default when no key is given)')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('-d', '--decrypt', action='store_true', help='Decrypt mode (default)')
+    mode.add_argument('-e', '--encrypt', action='store_true', help='Encrypt mode')
+
+    args = parser.parse_args()
+
+    decrypt = not args.encrypt
+    if args.auto_key or not (args.key or args.key_file or args.key_num):
+        if not decrypt:
+            print("Error: the key can only be detected when decrypting")
+            return
+        args.key_num = detect_key_num_for_file(args.input)
+        if args.key_num is None:
+            print("Error: none of the predefined keys fit this file")
+            return
+        print(f"  Using predefined key #{args.key_num}: {PREDEFINED_KEYS[args.key_num][0]}")
+
+    output = args.output or f"{args.input}.{'decrypted' if decrypt else 'encrypted'}"
+
+    try:
+        out = crypt_file(args.input, output, decrypt, args.key, args.key_file, args.key_num)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        return
+
+    if decrypt:
+        if has_pak_header(out):
+            print("the header (F7 D3 1F 10) seems to be present. good!")
+        else:
+            print("no header present (F7 D3 1F 10) in the decrypted file. not good.")
+    print(f"wrote {output}")
+
+if __name__ == '__main__':
+    main()
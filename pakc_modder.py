@@ -1,70 +1,70 @@
 import os
-import subprocess
 import argparse
 import shutil
 import struct
 import sys
+import glob
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-SOX_AVAILABLE = False
-SOX_PATH = None
+import pakc_crypt
+import pak_zlib
+import unpacker
+import repacker
+import dat_index
+import png_to_spt
+import spt_to_png_3
+import bix_converter
+import ima_adpcm
+from conversion_cache import ConversionCache, converter_version, DEFAULT_MAX_BYTES
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# shared by every conversion in this process, None when caching is off
+CONVERSION_CACHE = None
 
 def check_required_tools():
     """Check for required executables and tools"""
-    global SOX_AVAILABLE, SOX_PATH
+    missing_files = []
+    
+    # the blowfish tables are needed by pakc_crypt, they ship next to the scripts
+    for table in (pakc_crypt.P_ARRAY_FILE, pakc_crypt.S_BOXES_FILE):
+        if not os.path.exists(os.path.join(SCRIPT_DIR, table)):
+            missing_files.append(table)
+    
+    if missing_files:
+        print("\nERROR: The following required files were not found:")
+        for missing in missing_files:
+            print(f"  - {missing}")
+        print("\nPlease ensure these files are in the same folder as this script\n")
+        return False
     
-    required_exes = ['decrypt_pakc.exe', 'offzip.exe', 'packzip.exe']
-    missing_exes = []
+    return True
+
+
+def configure_cache(cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, link=False, enabled=True):
+    """Set up the conversion cache used by this process (also the batch workers' initializer)"""
+    global CONVERSION_CACHE
+    CONVERSION_CACHE = ConversionCache(cache_dir, max_bytes, link) if enabled else None
+
+def cached_file_conversion(converter, version, input_path, output_path, convert):
+    """Run a one file in, one file out conversion through the conversion cache, returns whether there's an output"""
+    if CONVERSION_CACHE is None:
+        return bool(convert())
     
-    # Check main executables
-    for exe in required_exes:
-        # Check in current folder
-        if os.path.exists(exe):
-            continue
-            
-        # Check in PATH
-        found_in_path = False
-        for path in os.environ['PATH'].split(os.pathsep):
-            exe_path = os.path.join(path, exe)
-            if os.path.exists(exe_path):
-                found_in_path = True
-                break
-                
-        if not found_in_path:
-            missing_exes.append(exe)
-    
-    # Check for SOX (either in ./sox or PATH)
-    sox_path = None
-    if os.path.exists("./sox/sox") or os.path.exists("./sox/sox.exe"):
-        SOX_AVAILABLE = True
-        SOX_PATH = "./sox/sox.exe" if sys.platform == "win32" else "./sox/sox"
-    else:
-        # Check PATH for sox
-        for path in os.environ['PATH'].split(os.pathsep):
-            potential_path = os.path.join(path, "sox.exe" if sys.platform == "win32" else "sox")
-            if os.path.exists(potential_path):
-                SOX_AVAILABLE = True
-                SOX_PATH = potential_path
-                break
+    key = CONVERSION_CACHE.key_for_file(input_path, converter, version)
+    if CONVERSION_CACHE.fetch(key, output_path) is not None:
+        return True
     
-    if missing_exes:
-        print("\nERROR: The following required executables were not found:")
-        for exe in missing_exes:
-            print(f"  - {exe}")
-        print("\nPlease ensure these files are either:")
-        print("1. In the same folder as this script, or")
-        print("2. Available in your system PATH\n")
+    if not convert():
         return False
-    
-    if not SOX_AVAILABLE:
-        print("\nWARNING: SOX audio tool not found. ADP audio conversion will be disabled.")
-        print("To enable ADP conversion, either:")
-        print("1. Place SOX in a './sox' subfolder, or")
-        print("2. Install SOX and ensure it's in your system PATH\n")
-    
+    if os.path.exists(output_path):
+        CONVERSION_CACHE.store(key, output_path, [output_path])
     return True
 
-
 def clear_create_dir(temp_dir):
     """Remove and recreate temp directory to ensure clean state"""
     if os.path.exists(temp_dir):
@@ -72,205 +72,228 @@ def clear_create_dir(temp_dir):
     os.makedirs(temp_dir, exist_ok=True)
 
 def decrypt_pakc(input_file, output_file, key=None, key_file=None, key_num=None):
-    """Decrypt .pakc file using decrypt_pakc.exe"""
-    cmd = ["decrypt_pakc.exe", "-i", input_file, "-o", output_file, "-d"]
-    
-    if key:
-        cmd.extend(["-k", key])
-    elif key_file:
-        cmd.extend(["-kf", key_file])
-    elif key_num:
-        cmd.extend(["-n", str(key_num)])
-    
+    """Decrypt .pakc file to .pak in-process with pakc_crypt"""
     try:
-        subprocess.run(cmd, check=True)
-        return True
-    except subprocess.CalledProcessError as e:
+        data = pakc_crypt.crypt_file(input_file, output_file, True, key, key_file, key_num)
+    except (ValueError, OSError) as e:
         print(f"Error decrypting {input_file}: {e}")
         return False
+    
+    if not pakc_crypt.has_pak_header(data):
+        print("no header present (F7 D3 1F 10) in the decrypted file. not good.")
+    return True
 
 def encrypt_pakc(input_file, output_file, key=None, key_file=None, key_num=None):
-    """Encrypt .pak file to .pakc using decrypt_pakc.exe"""
-    cmd = ["decrypt_pakc.exe", "-i", input_file, "-o", output_file, "-e"]
-    
-    if key:
-        cmd.extend(["-k", key])
-    elif key_file:
-        cmd.extend(["-kf", key_file])
-    elif key_num:
-        cmd.extend(["-n", str(key_num)])
-    
+    """Encrypt .pak file to .pakc in-process with pakc_crypt"""
     try:
-        subprocess.run(cmd, check=True)
+        pakc_crypt.crypt_file(input_file, output_file, False, key, key_file, key_num)
         return True
-    except subprocess.CalledProcessError as e:
+    except (ValueError, OSError) as e:
         print(f"Error encrypting {input_file}: {e}")
         return False
 
-def extract_with_offzip(input_file, output_dir):
-    """Extract single .dat from .pak using offzip"""
-    cmd = ["offzip.exe", "-a", input_file, output_dir, "0"]
+def extract_dat_from_pak(input_file, output_dir):
+    """Inflate the single .dat stored at offset 0x35 of the .pak"""
+    dat_file = os.path.join(output_dir, os.path.splitext(os.path.basename(input_file))[0] + ".dat")
     
     try:
-        subprocess.run(cmd, check=True)
-        # Find the extracted .dat file (should be only one)
-        dat_files = [f for f in os.listdir(output_dir) if f.endswith('.dat')]
-        if not dat_files:
-            print("Error: No .dat file found in offzip output")
-            return None
-        return os.path.join(output_dir, dat_files[0])
-    except subprocess.CalledProcessError as e:
-        print(f"Error extracting with offzip: {e}")
+        return pak_zlib.extract_dat(input_file, dat_file)
+    except (zlib.error, OSError) as e:
+        print(f"Error inflating {input_file}: {e}")
         return None
 
-def unpack_dat(input_file, output_dir=None):
-    """Unpack .dat file using unpacker.py"""
-    cmd = ["python", "unpacker.py", input_file]
-    if output_dir:
-        cmd.extend(["-o", output_dir])
-    
+def unpack_dat(input_file, output_dir=None, manifest_path=None):
+    """Unpack .dat file with unpacker.py, optionally writing the manifest for incremental repacks"""
     try:
-        subprocess.run(cmd, check=True)
+        unpacker.unpack_thing(input_file, output_dir, manifest_path=manifest_path)
         return True
-    except subprocess.CalledProcessError as e:
+    except (ValueError, OSError, struct.error) as e:
         print(f"Error unpacking {input_file}: {e}")
         return False
 
-def repack_dir(input_dir, output_file):
-    """Repack directory into .dat using repacker.py"""
-    cmd = ["python", "repacker.py", input_dir, output_file]
-    
+def repack_dir(input_dir, output_file, original_dat=None, manifest_path=None):
+    """Repack directory into .dat with repacker.py, reusing unchanged entries of original_dat if there's a manifest"""
     try:
-        subprocess.run(cmd, check=True)
-        return True
-    except subprocess.CalledProcessError as e:
+        reused = repacker.repack_thing(input_dir, output_file, None, original_dat, manifest_path)
+    except (ValueError, OSError, struct.error) as e:
         print(f"Error repacking {input_dir}: {e}")
         return False
-
-def pack_with_packzip(input_file, output_file, original_pak):
-    """Pack .dat into .pak using packzip.exe and copy header from original"""
-    # First run packzip
-    cmd = ["packzip.exe", "-c", "-o", "0x35", input_file,  output_file]
     
+    if reused:
+        print(f"Reused {reused} unchanged entries from {original_dat}")
+    return True
+
+def pack_dat_into_pak(input_file, output_file, original_pak):
+    """Deflate .dat into .pak behind the header of the original .pak, padded with 0xCD"""
     try:
-        subprocess.run(cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error packing with packzip: {e}")
+        pak_zlib.pack_dat(input_file, output_file, original_pak)
+        return True
+    except (zlib.error, ValueError, OSError) as e:
+        print(f"Error packing {input_file}: {e}")
         return False
-    
-    # Copy header from original .pak file
+
+def stream_extract_pakc(pakc_file, extracted_dir, key=None, key_file=None, key_num=None, manifest_path=None):
+    """Decrypt, inflate and unpack a .pakc in memory, returns the .pak header and the .dat for the way back"""
     try:
-        with open(original_pak, 'rb') as f:
-            header = f.read(0x35)  # Read the header
+        cipher = pakc_crypt.PakcCipher(pakc_crypt.resolve_key(key, key_file, key_num))
+        with open(pakc_file, 'rb') as f:
+            pak_stream = cipher.decrypt_chunks(pak_zlib.read_file_chunks(f))
+            header, body = pak_zlib.split_header(pak_stream)
+            if not pakc_crypt.has_pak_header(header):
+                print("no header present (F7 D3 1F 10) in the decrypted file. not good.")
+            dat = b''.join(pak_zlib.inflate_chunks(body))
         
-        with open(output_file, 'r+b') as f:
-            original_content = f.read()
-            f.seek(0)
-            f.write(header)
-            f.write(original_content[53:])
-            
-            # Pad with 0xCD to nearest dword boundary
-            current_size = f.tell()
-            pad_size = (8 - (current_size % 8)) % 8
-            f.write(b'\xCD' * pad_size)
+        unpacker.unpack_bytes(dat, extracted_dir, manifest_path=manifest_path)
+        return header, dat
+    except (zlib.error, ValueError, OSError, struct.error) as e:
+        print(f"Error extracting {pakc_file}: {e}")
+        return None, None
+
+def stream_repack_pakc(input_dir, output_pakc, pak_header, key=None, key_file=None, key_num=None, original_dat=None, manifest_path=None):
+    """Repack, deflate and encrypt a directory straight into the final .pakc, unchanged entries come from original_dat"""
+    original = None
+    try:
+        cipher = pakc_crypt.PakcCipher(pakc_crypt.resolve_key(key, key_file, key_num))
+        
+        manifest = None
+        if original_dat is not None and manifest_path and os.path.exists(manifest_path):
+            original = dat_index.DatIndex(original_dat)
+            manifest = dat_index.load_manifest(manifest_path)
+        
+        dat_stream = repacker.iter_repack_chunks(input_dir, original=original, manifest=manifest)
+        pak_stream = pak_zlib.pak_chunks(pak_header, dat_stream)
+        with open(output_pakc, 'wb') as f:
+            for chunk in cipher.encrypt_chunks(pak_stream):
+                f.write(chunk)
         
+        if manifest is not None:
+            dat_index.save_manifest(manifest_path, manifest)
         return True
-    except IOError as e:
-        print(f"Error processing pak header: {e}")
+    except (zlib.error, ValueError, OSError, EOFError) as e:
+        print(f"Error repacking {input_dir}: {e}")
         return False
+    finally:
+        # watch mode repacks over and over, don't leave the original .dat mapped in between
+        if original is not None:
+            original.close()
+
+def convert_spt_file(input_path, output_dir):
+    """Convert one SPT file to PNG(s) with spt_to_png_3.py, through the conversion cache if there is one"""
+    file = os.path.basename(input_path)
+    if CONVERSION_CACHE is None:
+        spt_to_png_3.read_spt_file(input_path, file, output_dir)
+        return True
+    
+    version = converter_version(os.path.join(SCRIPT_DIR, "spt_to_png_3.py"))
+    key = CONVERSION_CACHE.key_for_file(input_path, "spt_to_png", version)
+    if CONVERSION_CACHE.fetch(key, os.path.join(output_dir, file[:-4])) is not None:
+        return True
+    
+    # convert into a folder of its own, so whatever shows up there is exactly its output
+    with tempfile.TemporaryDirectory(dir=output_dir) as staging:
+        spt_to_png_3.read_spt_file(input_path, file, staging)
+        paths = [os.path.join(staging, name) for name in os.listdir(staging)]
+        if paths:
+            CONVERSION_CACHE.store(key, os.path.join(staging, file[:-4]), paths)
+        for path in paths:
+            shutil.move(path, os.path.join(output_dir, os.path.basename(path)))
+    return True
+
+def spt_jobs(input_dir, output_dir):
+    """Conversion jobs for every SPT file directly inside input_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    for entry in os.scandir(input_dir):
+        if entry.is_file() and entry.name.lower().endswith('.spt'):
+            jobs.append((entry.name, entry.stat().st_size, convert_spt_file, (entry.path, output_dir)))
+    return jobs
 
-def convert_spt_to_png(input_dir, output_dir=None):
-    """Convert SPT files to PNG using spt_to_png_3.py"""
+def convert_spt_to_png(input_dir, output_dir=None, jobs=1):
+    """Convert SPT files to PNG with spt_to_png_3.py"""
     if output_dir is None:
         output_dir = os.path.join(input_dir, "png_output")
     
-    cmd = ["python", "spt_to_png_3.py", input_dir]
-    if output_dir:
-        cmd.extend(["-o", output_dir])
-    
-    try:
-        subprocess.run(cmd, check=True)
+    if run_conversion_jobs(spt_jobs(input_dir, output_dir), jobs):
         return output_dir
-    except subprocess.CalledProcessError as e:
-        print(f"Error converting SPT to PNG: {e}")
-        return None
+    return None
 
-def convert_png_to_spt(input_dir, output_dir=None):
-    """Convert PNG files back to SPT using png_to_spt.py"""
+def png_jobs(input_dir, output_dir):
+    """Conversion jobs for every PNG group (one per .spt) inside input_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    sizes = {}
+    for entry in os.scandir(input_dir):
+        if entry.is_file() and entry.name.lower().endswith('.png'):
+            sizes[entry.name] = entry.stat().st_size
+    
+    jobs = []
+    for base_name, files in png_to_spt.group_png_files(list(sizes)).items():
+        size = sum(sizes[file] for file in files)
+        jobs.append((base_name, size, png_to_spt.convert_png_group, (input_dir, base_name, files, output_dir)))
+    return jobs
+
+def convert_png_to_spt(input_dir, output_dir=None, jobs=1):
+    """Convert PNG files back to SPT with png_to_spt.py"""
     if output_dir is None:
         output_dir = os.path.join(input_dir, "spt_output")
     
-    cmd = ["python", "png_to_spt.py", input_dir]
-    if output_dir:
-        cmd.extend(["-o", output_dir])
-    
-    try:
-        subprocess.run(cmd, check=True)
+    if run_conversion_jobs(png_jobs(input_dir, output_dir), jobs):
         return output_dir
-    except subprocess.CalledProcessError as e:
-        print(f"Error converting PNG to SPT: {e}")
-        return None
+    return None
 
 def convert_bix_to_gltf(input_path, output_path):
-    """Convert BIX to GLTF using bix_converter.py"""
-    cmd = ["python", "bix_converter.py", "--bix-to-gltf", input_path, output_path]
-    
-    try:
-        subprocess.run(cmd, check=True)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error converting BIX to GLTF: {e}")
-        return False
+    """Convert BIX to GLTF with bix_converter.py"""
+    def convert():
+        try:
+            bix_converter.convert_bix_to_gltf(input_path, output_path)
+            return True
+        except Exception as e:
+            print(f"Error converting BIX to GLTF: {e}")
+            return False
+    
+    version = converter_version(os.path.join(SCRIPT_DIR, "bix_converter.py"))
+    return cached_file_conversion("bix_to_gltf", version, input_path, output_path, convert)
 
 def convert_gltf_to_bix(input_path, output_path):
-    """Convert GLTF to BIX using bix_converter.py"""
-    cmd = ["python", "bix_converter.py", "--gltf-to-bix", input_path, output_path]
-    
+    """Convert GLTF to BIX with bix_converter.py"""
     try:
-        subprocess.run(cmd, check=True)
+        bix_converter.convert_gltf_to_bix(input_path, output_path)
         return True
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         print(f"Error converting GLTF to BIX: {e}")
         return False
 
 def convert_adp_to_wav(input_path, output_path=None):
-    """Convert ADP to WAV using sox"""
-    if not SOX_AVAILABLE:
-        print("ADP conversion disabled - SOX not found")
-        return None
-        
+    """Convert ADP to WAV with ima_adpcm.py"""
     if output_path is None:
         output_path = input_path.replace('.adp', '.wav')
     
-    cmd = [SOX_PATH, "-t", "ima", "-r", "8000", "-e", "ima-adpcm", input_path, "-t", "wav", output_path]
+    def convert():
+        try:
+            ima_adpcm.adp_to_wav(input_path, output_path)
+            return True
+        except (ValueError, OSError) as e:
+            print(f"Error converting ADP to WAV: {e}")
+            return False
     
-    try:
-        subprocess.run(cmd, check=True)
+    version = converter_version(os.path.join(SCRIPT_DIR, "ima_adpcm.py"))
+    if cached_file_conversion("adp_to_wav", version, input_path, output_path, convert):
         return output_path
-    except subprocess.CalledProcessError as e:
-        print(f"Error converting ADP to WAV: {e}")
-        return None
+    return None
 
 def convert_wav_to_adp(input_path, output_path=None):
-    """Convert WAV to ADP using sox"""
+    """Convert WAV to ADP with ima_adpcm.py"""
     if output_path is None:
         output_path = input_path.replace('.wav', '.adp')
     
-    cmd = ["./sox/sox", input_path, "-t", "ima", "-r", "8000", "-e", "ima-adpcm", output_path]
-    
     try:
-        subprocess.run(cmd, check=True)
-        return output_path
-    except subprocess.CalledProcessError as e:
+        return ima_adpcm.wav_to_adp(input_path, output_path)
+    except (ValueError, OSError, EOFError, struct.error) as e:
         print(f"Error converting WAV to ADP: {e}")
         return None
 
-def batch_convert_files(input_dir, extension, conversion_func, output_suffix="_converted", output_extension = None):
-    """Batch convert files with given extension using the specified conversion function"""
-    output_dir = os.path.join(input_dir, f"{extension[1:]}{output_suffix}")
-    os.makedirs(output_dir, exist_ok=True)
-    
-    converted_files = []
+def file_jobs(input_dir, output_dir, extension, conversion_func, output_extension=None):
+    """Conversion jobs for every file with the given extension under input_dir, mirrored into output_dir"""
+    jobs = []
     for root, _, files in os.walk(input_dir):
         for file in files:
             if file.endswith(extension):
@@ -278,126 +301,216 @@ def batch_convert_files(input_dir, extension, conversion_func, output_suffix="_c
                 rel_path = os.path.relpath(input_path, input_dir)
                 output_path = os.path.join(output_dir, rel_path)
                 os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
+                
                 if output_extension is not None:
                     output_path = output_path.replace(extension, output_extension)
                 
-                if conversion_func(input_path, output_path):
-                    converted_files.append(output_path)
-    
-    return output_dir if converted_files else None
-
-def process_pakc(pakc_file, output_base_dir, key=None, key_file=None, key_num=None):
-    """Full processing pipeline for .pakc file"""
-    temp_dir = os.path.join(output_base_dir, "temp")
-    extracted_dir = os.path.join(output_base_dir, "extracted")
-    repacked_dir = os.path.join(output_base_dir, "repacked")
-    adp_temp_dir = os.path.join(temp_dir, "adp_originals")
-    
-    clear_create_dir(temp_dir)
-    os.makedirs(extracted_dir, exist_ok=True)
-    clear_create_dir(repacked_dir)
-    clear_create_dir(adp_temp_dir)
-    
-    # decrypt .pakc to .pak
-    pak_file = os.path.join(temp_dir, os.path.basename(pakc_file).replace(".pakc", ".pak"))
-    if not decrypt_pakc(pakc_file, pak_file, key, key_file, key_num):
-        return False
-    
-    # extract the .dat from .pak with offzip
-    offzip_output = os.path.join(temp_dir, "offzip_out")
-    os.makedirs(offzip_output, exist_ok=True)
-    dat_file = extract_with_offzip(pak_file, offzip_output)
+                jobs.append((rel_path, os.path.getsize(input_path), conversion_func, (input_path, output_path)))
+    return jobs
+
+def batch_convert_files(input_dir, extension, conversion_func, output_suffix="_converted", output_extension = None, jobs=1):
+    """Batch convert files with given extension using the specified conversion function"""
+    output_dir = os.path.join(input_dir, f"{extension[1:]}{output_suffix}")
+    os.makedirs(output_dir, exist_ok=True)
     
-    if not dat_file:
-        return False
+    conversion_jobs = file_jobs(input_dir, output_dir, extension, conversion_func, output_extension)
+    if conversion_jobs and run_conversion_jobs(conversion_jobs, jobs):
+        return output_dir
+    return None
+
+def init_conversion_worker(cache):
+    """Give a conversion worker process the same conversion cache as the main one"""
+    global CONVERSION_CACHE
+    CONVERSION_CACHE = cache
+
+def run_conversion_job(conversion_func, args):
+    """Run one conversion, returns (ok, seconds, cache hits, cache misses)"""
+    start = time.perf_counter()
+    hits, misses = (CONVERSION_CACHE.hits, CONVERSION_CACHE.misses) if CONVERSION_CACHE else (0, 0)
+    try:
+        ok = bool(conversion_func(*args))
+    except Exception as e:
+        print(f"Error converting {args[0]}: {e}")
+        ok = False
+    if CONVERSION_CACHE is not None:
+        hits, misses = CONVERSION_CACHE.hits - hits, CONVERSION_CACHE.misses - misses
+    return ok, time.perf_counter() - start, hits, misses
+
+def run_conversion_jobs(jobs, max_workers=1):
+    """
+    Run conversion jobs, biggest first so a huge file doesn't end up being the tail. Stops at the first failure
+    :param jobs: List of (label, size, conversion function, args), the function has to be a module level one
+    :param max_workers: How many conversions to run at once, 1 runs them in this process
+    :return: Whether every job went through
+    """
+    jobs = sorted(jobs, key=lambda job: job[1], reverse=True)
+    
+    def report(label, ok, seconds):
+        print(f"  {'ok    ' if ok else 'FAILED'} {label} ({seconds:.2f}s)")
+    
+    if max_workers <= 1 or len(jobs) <= 1:
+        for label, _, conversion_func, args in jobs:
+            ok, seconds, _, _ = run_conversion_job(conversion_func, args)
+            report(label, ok, seconds)
+            if not ok:
+                return False
+        return True
     
-    # unpack the .dat file
-    if not unpack_dat(dat_file, extracted_dir):
-        return False
+    all_ok = True
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_conversion_worker, initargs=(CONVERSION_CACHE,)) as pool:
+        futures = {pool.submit(run_conversion_job, conversion_func, args): label for label, _, conversion_func, args in jobs}
+        for future in as_completed(futures):
+            try:
+                ok, seconds, hits, misses = future.result()
+            except Exception as e:
+                print(f"Error converting {futures[future]}: {e}")
+                ok, seconds, hits, misses = False, 0.0, 0, 0
+            report(futures[future], ok, seconds)
+            if CONVERSION_CACHE is not None:
+                CONVERSION_CACHE.hits += hits
+                CONVERSION_CACHE.misses += misses
+            if not ok:
+                # whatever hasn't started yet doesn't get to
+                for pending in futures:
+                    pending.cancel()
+                all_ok = False
+                break
+    return all_ok
 
-    initial_file_list = []
-    for entry in os.listdir(extracted_dir):
-        full_path = os.path.join(extracted_dir, entry)
-        if os.path.isfile(full_path):
-            initial_file_list.append(entry)
+class Workspace:
+    """Where everything for one .pakc goes inside its output directory"""
+    def __init__(self, pakc_file, output_base_dir):
+        self.pakc_file = pakc_file
+        self.output_base_dir = output_base_dir
+        self.temp_dir = os.path.join(output_base_dir, "temp")
+        self.extracted_dir = os.path.join(output_base_dir, "extracted")
+        self.repacked_dir = os.path.join(output_base_dir, "repacked")
+        self.adp_temp_dir = os.path.join(self.temp_dir, "adp_originals")
+        # content hashes of everything extracted, so unchanged entries can be copied from the original .dat on repack
+        self.manifest_path = os.path.join(self.temp_dir, "extract_manifest.json")
+        # the 0x35 byte .pak header, kept so the archive can be rebuilt in a later run
+        self.pak_header_file = os.path.join(self.temp_dir, "pak_header.bin")
+        self.pak_file = os.path.join(self.temp_dir, os.path.basename(pakc_file).replace(".pakc", ".pak"))
+        self.dat_file = os.path.join(self.temp_dir, "dat_out", os.path.splitext(os.path.basename(self.pak_file))[0] + ".dat")
+        self.png_dir = os.path.join(self.extracted_dir, "png_output")
+        self.gltf_dir = os.path.join(self.extracted_dir, "bix_converted")
+        self.wav_dir = os.path.join(self.extracted_dir, "adp_converted")
+        self.output_pakc = os.path.join(output_base_dir, os.path.basename(pakc_file))
+
+def extract_stage(ws, key=None, key_file=None, key_num=None, stream=False):
+    """Decrypt and unpack the .pakc into the workspace, returns the original .dat (bytes when streaming, a path otherwise) or None"""
+    clear_create_dir(ws.temp_dir)
+    os.makedirs(ws.extracted_dir, exist_ok=True)
+    clear_create_dir(ws.repacked_dir)
+    clear_create_dir(ws.adp_temp_dir)
+    
+    if stream:
+        # decrypt, inflate and unpack without the intermediate .pak/.dat files
+        pak_header, original_dat = stream_extract_pakc(ws.pakc_file, ws.extracted_dir, key, key_file, key_num, ws.manifest_path)
+        if pak_header is None:
+            return None
+    else:
+        # decrypt .pakc to .pak
+        if not decrypt_pakc(ws.pakc_file, ws.pak_file, key, key_file, key_num):
+            return None
+        
+        # inflate the .dat out of the .pak
+        os.makedirs(os.path.dirname(ws.dat_file), exist_ok=True)
+        original_dat = extract_dat_from_pak(ws.pak_file, os.path.dirname(ws.dat_file))
+        
+        if not original_dat:
+            return None
+        
+        # unpack the .dat file
+        if not unpack_dat(original_dat, ws.extracted_dir, ws.manifest_path):
+            return None
+        
+        with open(ws.pak_file, 'rb') as f:
+            pak_header = f.read(pak_zlib.PAK_HEADER_LEN)
+    
+    with open(ws.pak_header_file, 'wb') as f:
+        f.write(pak_header)
     
     # save original ADP files to temp directory before any conversion
-    for root, _, files in os.walk(extracted_dir):
+    for root, _, files in os.walk(ws.extracted_dir):
         for file in files:
             if file.endswith('.adp'):
                 src_path = os.path.join(root, file)
-                rel_path = os.path.relpath(src_path, extracted_dir)
-                dest_path = os.path.join(adp_temp_dir, rel_path)
+                rel_path = os.path.relpath(src_path, ws.extracted_dir)
+                dest_path = os.path.join(ws.adp_temp_dir, rel_path)
                 os.makedirs(os.path.dirname(dest_path), exist_ok=True)
                 shutil.copy2(src_path, dest_path)
     
-    print(f"\nExtraction complete! Files are in: {extracted_dir}")
+    print(f"\nExtraction complete! Files are in: {ws.extracted_dir}")
+    return original_dat
+
+def convert_stage(ws, spt=False, bix=False, adp=False, jobs=1):
+    """Convert the extracted assets to editable formats, all of them in one go. returns the (png, gltf, wav) output dirs (None for skipped ones), or None if a conversion failed"""
+    spt_list = spt_jobs(ws.extracted_dir, ws.png_dir) if spt else []
+    bix_list = file_jobs(ws.extracted_dir, ws.gltf_dir, ".bix", convert_bix_to_gltf, ".gltf") if bix else []
+    adp_list = file_jobs(ws.extracted_dir, ws.wav_dir, ".adp", convert_adp_to_wav, ".wav") if adp else []
+
+    conversion_jobs = spt_list + bix_list + adp_list
+    if not conversion_jobs:
+        return None, None, None
     
-    # Come down to the boardwalk, we have SPT, we've got BIX, ADP, best on the boardwalk 
-    convert_choice = input("Do you want to convert the assets for editing? (SPT/BIX/ADP) (y/n): ").lower()
+    if CONVERSION_CACHE is not None:
+        hits, misses = CONVERSION_CACHE.hits, CONVERSION_CACHE.misses
     
-    if convert_choice == 'y':
-        spt_choice = input("Convert SPT to PNG? (y/n): ").lower()
-        if spt_choice == 'y':
-            png_output_dir = convert_spt_to_png(extracted_dir)
-            if png_output_dir:
-                print(f"PNG files created in: {png_output_dir}")
-        
-        bix_choice = input("Convert BIX to GLTF? (y/n): ").lower()
-        if bix_choice == 'y':
-            gltf_output_dir = batch_convert_files(extracted_dir, ".bix", convert_bix_to_gltf, "_converted", ".gltf")
-            if gltf_output_dir:
-                print(f"GLTF files created in: {gltf_output_dir}")
-        
-        adp_choice = input("Convert ADP to WAV? (y/n): ").lower()
-        if adp_choice == 'y':
-            wav_output_dir = batch_convert_files(extracted_dir, ".adp", convert_adp_to_wav, "_converted", ".wav")
-            if wav_output_dir:
-                print(f"WAV files created in: {wav_output_dir}")
-        
-        print("\nEdit the converted files, then press Enter when ready to continue...")
-        input()
-        
-        if spt_choice == 'y' and png_output_dir:
-            spt_output_dir = convert_png_to_spt(png_output_dir, extracted_dir)
-            if not spt_output_dir:
-                return False
-            print("Converted PNG files back to SPT format")
-        
-        if bix_choice == 'y' and gltf_output_dir:
-            for root, _, files in os.walk(gltf_output_dir):
-                for file in files:
-                    if file.endswith('.gltf'):
-                        gltf_path = os.path.join(root, file)
-                        rel_path = os.path.relpath(gltf_path, gltf_output_dir)
-                        bix_path = os.path.join(extracted_dir, rel_path.replace('.gltf', '.bix'))
-                        os.makedirs(os.path.dirname(bix_path), exist_ok=True)
-                        if not convert_gltf_to_bix(gltf_path, bix_path):
-                            return False
-            print("Converted GLTF files back to BIX format")
-        
-        if adp_choice == 'y' and wav_output_dir:
-            for root, _, files in os.walk(wav_output_dir):
-                for file in files:
-                    if file.endswith('.wav'):
-                        wav_path = os.path.join(root, file)
-                        rel_path = os.path.relpath(wav_path, wav_output_dir)
-                        adp_path = os.path.join(extracted_dir, rel_path.replace('.wav', '.adp'))
-                        os.makedirs(os.path.dirname(adp_path), exist_ok=True)
-                        if not convert_wav_to_adp(wav_path, adp_path):
-                            return False
-            print("Converted WAV files back to ADP format")
-    else:
-        print("You can now edit the files directly. When ready to repack, press Enter to continue...")
-        input()
+    print(f"Converting {len(conversion_jobs)} files...")
+    if not run_conversion_jobs(conversion_jobs, jobs):
+        print("Conversion stopped at the first failure")
+        return None
+    
+    output_dirs = (ws.png_dir if spt_list else None, ws.gltf_dir if bix_list else None, ws.wav_dir if adp_list else None)
+    for kind, output_dir in zip(("PNG", "GLTF", "WAV"), output_dirs):
+        if output_dir:
+            print(f"{kind} files created in: {output_dir}")
+    
+    if CONVERSION_CACHE is not None:
+        print(f"Conversion cache: {CONVERSION_CACHE.hits - hits} files reused, {CONVERSION_CACHE.misses - misses} converted")
+        CONVERSION_CACHE.trim()
+    
+    return output_dirs
+
+def back_convert_stage(ws, spt=None, bix=None, adp=None, jobs=1):
+    """Convert the edited files back into the extracted folder, None means 'if it was converted before'"""
+    if spt is None:
+        spt = os.path.isdir(ws.png_dir)
+    if bix is None:
+        bix = os.path.isdir(ws.gltf_dir)
+    if adp is None:
+        adp = os.path.isdir(ws.wav_dir)
+    
+    conversion_jobs = []
+    if spt:
+        conversion_jobs += png_jobs(ws.png_dir, ws.extracted_dir)
+    if bix:
+        conversion_jobs += file_jobs(ws.gltf_dir, ws.extracted_dir, ".gltf", convert_gltf_to_bix, ".bix")
+    if adp:
+        conversion_jobs += file_jobs(ws.wav_dir, ws.extracted_dir, ".wav", convert_wav_to_adp, ".adp")
+    
+    if not conversion_jobs:
+        return True
+    
+    print(f"Converting {len(conversion_jobs)} files back...")
+    if not run_conversion_jobs(conversion_jobs, jobs):
+        return False
     
-    for root, _, files in os.walk(extracted_dir):
+    for kind, done in (("PNG files back to SPT", spt), ("GLTF files back to BIX", bix), ("WAV files back to ADP", adp)):
+        if done:
+            print(f"Converted {kind} format")
+    return True
+
+def truncate_adp_files(ws):
+    """Cut .adp files that grew past their original size back down to it, returns the paths that got cut"""
+    truncated = []
+    for root, _, files in os.walk(ws.extracted_dir):
         for file in files:
             if file.endswith('.adp'):
                 current_path = os.path.join(root, file)
-                rel_path = os.path.relpath(current_path, extracted_dir)
-                original_path = os.path.join(adp_temp_dir, rel_path)
+                rel_path = os.path.relpath(current_path, ws.extracted_dir)
+                original_path = os.path.join(ws.adp_temp_dir, rel_path)
                 
                 if os.path.exists(original_path):
                     original_size = os.path.getsize(original_path)
@@ -410,50 +523,369 @@ def process_pakc(pakc_file, output_base_dir, key=None, key_file=None, key_num=No
                             f.seek(0)
                             f.write(data)
                             f.truncate()
+                        truncated.append(current_path)
+    return truncated
+
+def repack_stage(ws, key=None, key_file=None, key_num=None, stream=False, original_dat=None):
+    """Repack the extracted folder into the final .pakc, original_dat is whatever extract_stage returned (if it's still around)"""
+    truncate_adp_files(ws)
     
     edited_file_list = []
-    for entry in os.listdir(extracted_dir):
-        full_path = os.path.join(extracted_dir, entry)
+    for entry in os.listdir(ws.extracted_dir):
+        full_path = os.path.join(ws.extracted_dir, entry)
         if os.path.isfile(full_path):
             edited_file_list.append(entry)
     
-    if edited_file_list != initial_file_list:
-        print()
-        print("   WARNING: Changing the filenames/adding extra files will likely cause the game to crash when loading the .pakc")
-        print()
-
-    # repack the directory
-    repacked_dat = os.path.join(repacked_dir, "repacked.dat")
-    if not repack_dir(extracted_dir, repacked_dat):
-        return False
+    # the manifest has every name that came out of the original .dat
+    if os.path.exists(ws.manifest_path):
+        initial_file_list = list(dat_index.load_manifest(ws.manifest_path))
+        if sorted(edited_file_list) != sorted(initial_file_list):
+            print()
+            print("   WARNING: Changing the filenames/adding extra files will likely cause the game to crash when loading the .pakc")
+            print()
     
-    # pack .dat back to .pak
-    repacked_pak = os.path.join(temp_dir, "repacked.pak")
-    if not pack_with_packzip(repacked_dat, repacked_pak, pak_file):
+    if not os.path.exists(ws.pak_header_file):
+        print(f"Error: {ws.pak_header_file} is missing, extract the .pakc again")
         return False
     
-    # encrypt back to .pakc
-    output_pakc = os.path.join(output_base_dir, os.path.basename(pakc_file))
-    if not encrypt_pakc(repacked_pak, output_pakc, key, key_file, key_num):
+    if original_dat is None and os.path.exists(ws.dat_file):
+        original_dat = ws.dat_file
+    
+    if stream:
+        with open(ws.pak_header_file, 'rb') as f:
+            pak_header = f.read()
+        
+        # repack, deflate and encrypt straight into the final .pakc
+        if not stream_repack_pakc(ws.extracted_dir, ws.output_pakc, pak_header, key, key_file, key_num, original_dat, ws.manifest_path):
+            return False
+    else:
+        os.makedirs(ws.repacked_dir, exist_ok=True)
+        
+        # repack the directory
+        repacked_dat = os.path.join(ws.repacked_dir, "repacked.dat")
+        if not repack_dir(ws.extracted_dir, repacked_dat, original_dat, ws.manifest_path):
+            return False
+        
+        # pack .dat back to .pak, the saved header doubles as the original .pak here
+        repacked_pak = os.path.join(ws.temp_dir, "repacked.pak")
+        if not pack_dat_into_pak(repacked_dat, repacked_pak, ws.pak_header_file):
+            return False
+        
+        # encrypt back to .pakc
+        if not encrypt_pakc(repacked_pak, ws.output_pakc, key, key_file, key_num):
+            return False
+    
+    print(f"\nRepacking complete! Final file is: {ws.output_pakc}")
+    return True
+
+def process_pakc(pakc_file, output_base_dir, key=None, key_file=None, key_num=None, stream=False, watch=False, jobs=1):
+    """Full processing pipeline for .pakc file, stream keeps the .pak/.dat stages in memory, watch rebuilds on every change instead of waiting for Enter and jobs is how many files get converted at once"""
+    ws = Workspace(pakc_file, output_base_dir)
+    
+    original_dat = extract_stage(ws, key, key_file, key_num, stream)
+    if original_dat is None:
         return False
     
-    print(f"\nRepacking complete! Final file is: {output_pakc}")
+    # Come down to the boardwalk, we have SPT, we've got BIX, ADP, best on the boardwalk 
+    convert_choice = input("Do you want to convert the assets for editing? (SPT/BIX/ADP) (y/n): ").lower()
+    
+    if convert_choice == 'y':
+        spt_choice = input("Convert SPT to PNG? (y/n): ").lower()
+        bix_choice = input("Convert BIX to GLTF? (y/n): ").lower()
+        adp_choice = input("Convert ADP to WAV? (y/n): ").lower()
+        
+        output_dirs = convert_stage(ws, spt_choice == 'y', bix_choice == 'y', adp_choice == 'y', jobs)
+        if output_dirs is None:
+            return False
+        png_output_dir, gltf_output_dir, wav_output_dir = output_dirs
+        
+        if watch:
+            return watch_workspace(ws, key, key_file, key_num, original_dat)
+        
+        print("\nEdit the converted files, then press Enter when ready to continue...")
+        input()
+        
+        if not back_convert_stage(ws, bool(png_output_dir), bool(gltf_output_dir), bool(wav_output_dir), jobs):
+            return False
+    elif watch:
+        return watch_workspace(ws, key, key_file, key_num, original_dat)
+    else:
+        print("You can now edit the files directly. When ready to repack, press Enter to continue...")
+        input()
+    
+    return repack_stage(ws, key, key_file, key_num, stream, original_dat)
+
+# how often the workspace gets polled and how long it has to stay quiet before a rebuild, in seconds
+WATCH_POLL_INTERVAL = 0.1
+WATCH_DEBOUNCE = 0.25
+
+def scan_tree(path, extension=None, recursive=True):
+    """path -> (size, mtime_ns) for the files under path"""
+    found = {}
+    if not os.path.isdir(path):
+        return found
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir():
+                if recursive:
+                    found.update(scan_tree(entry.path, extension))
+            elif extension is None or entry.name.lower().endswith(extension):
+                st = entry.stat()
+                found[entry.path] = (st.st_size, st.st_mtime_ns)
+    return found
+
+def scan_workspace(ws):
+    """Everything watch mode reacts to: the extracted files themselves and the PNG/glTF/WAV folders"""
+    snapshot = scan_tree(ws.extracted_dir, recursive=False)
+    snapshot.update(scan_tree(ws.png_dir, ".png", recursive=False))
+    snapshot.update(scan_tree(ws.gltf_dir, ".gltf"))
+    snapshot.update(scan_tree(ws.wav_dir, ".wav"))
+    return snapshot
+
+def convert_changed(ws, changed):
+    """Convert only the changed PNG/glTF/WAV files back, returns (ok, files that got written)"""
+    written = set()
+    
+    png_groups = set()
+    for path in changed:
+        if os.path.dirname(path) == ws.png_dir and path.lower().endswith('.png'):
+            png_groups.add(png_to_spt.png_group_name(os.path.basename(path)))
+    if png_groups:
+        png_files = [f for f in os.listdir(ws.png_dir) if f.lower().endswith('.png')]
+        for base_name, files in png_to_spt.group_png_files(png_files).items():
+            if base_name in png_groups:
+                try:
+                    written.add(png_to_spt.convert_png_group(ws.png_dir, base_name, files, ws.extracted_dir))
+                except (OSError, ValueError, EOFError) as e:
+                    # half-saved png, frames of different sizes and so on, the next save gets another go
+                    print(f"Error converting {base_name} back to SPT: {e}")
+                    return False, written
+    
+    for path in sorted(changed):
+        if not os.path.exists(path):
+            continue
+        if path.startswith(ws.gltf_dir + os.sep) and path.endswith('.gltf'):
+            rel_path = os.path.relpath(path, ws.gltf_dir)
+            target = os.path.join(ws.extracted_dir, rel_path.replace('.gltf', '.bix'))
+            if not convert_gltf_to_bix(path, target):
+                return False, written
+            written.add(target)
+        elif path.startswith(ws.wav_dir + os.sep) and path.endswith('.wav'):
+            rel_path = os.path.relpath(path, ws.wav_dir)
+            target = os.path.join(ws.extracted_dir, rel_path.replace('.wav', '.adp'))
+            if not convert_wav_to_adp(path, target):
+                return False, written
+            written.add(target)
+    
+    return True, written
+
+def watch_workspace(ws, key=None, key_file=None, key_num=None, original_dat=None,
+                    poll_interval=WATCH_POLL_INTERVAL, debounce=WATCH_DEBOUNCE):
+    """Rebuild the output .pakc every time something in the workspace changes, until Ctrl+C"""
+    print(f"\nWatching {ws.extracted_dir} for changes, the .pakc gets rebuilt on every save. Ctrl+C to stop.")
+    snapshot = scan_workspace(ws)
+    
+    try:
+        while True:
+            time.sleep(poll_interval)
+            current = scan_workspace(ws)
+            if current == snapshot:
+                continue
+            
+            # editors tend to write in bursts, wait for it to settle down
+            while True:
+                time.sleep(debounce)
+                settled = scan_workspace(ws)
+                if settled == current:
+                    break
+                current = settled
+            
+            changed = {path for path in current.keys() | snapshot.keys() if current.get(path) != snapshot.get(path)}
+            start = time.perf_counter()
+            
+            ok, written = convert_changed(ws, changed)
+            if ok:
+                # the .adp files that get cut back to size are ours too, but only those, an .adp the user saves meanwhile still counts as a change
+                written.update(truncate_adp_files(ws))
+                ok = repack_stage(ws, key, key_file, key_num, True, original_dat)
+            
+            # take in what we wrote, but keep anything the user changed during the rebuild pending
+            after = scan_workspace(ws)
+            snapshot = dict(after)
+            for path in after.keys() | current.keys():
+                if path not in written and after.get(path) != current.get(path):
+                    if path in current:
+                        snapshot[path] = current[path]
+                    else:
+                        snapshot.pop(path, None)
+            
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if ok:
+                print(f"Rebuilt {ws.output_pakc} in {elapsed_ms:.0f} ms ({len(changed)} changed)")
+            else:
+                print(f"Rebuild failed after {elapsed_ms:.0f} ms, fix the files and save again")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    
     return True
 
+def find_pakc_files(pattern):
+    """All .pakc files in a directory, or matching a glob"""
+    if os.path.isdir(pattern):
+        candidates = [os.path.join(pattern, f) for f in os.listdir(pattern)]
+    else:
+        candidates = glob.glob(pattern)
+    return sorted(f for f in candidates if os.path.isfile(f) and f.lower().endswith('.pakc'))
+
+def run_batch_stages(ws, stage, convert, key=None, key_file=None, key_num=None, stream=False, jobs=1):
+    """The non-interactive version of process_pakc"""
+    original_dat = None
+    if stage in ("extract", "all"):
+        original_dat = extract_stage(ws, key, key_file, key_num, stream)
+        if original_dat is None:
+            return False
+        if convert_stage(ws, "spt" in convert, "bix" in convert, "adp" in convert, jobs) is None:
+            return False
+    
+    if stage in ("build", "all"):
+        if not os.path.isdir(ws.extracted_dir):
+            print(f"Error: nothing extracted in {ws.output_base_dir} yet")
+            return False
+        if not back_convert_stage(ws, jobs=jobs):
+            return False
+        return repack_stage(ws, key, key_file, key_num, stream, original_dat)
+    
+    return True
+
+def batch_worker(pakc_file, output_base_dir, stage, convert, key=None, key_file=None, key_num=None, stream=False, jobs=1):
+    """Process one archive of a batch, with everything it prints going to its own log. returns (ok, seconds, log path)"""
+    start = time.perf_counter()
+    os.makedirs(output_base_dir, exist_ok=True)
+    log_path = os.path.join(output_base_dir, "batch.log")
+    
+    # redirect the file descriptors, not just sys.stdout, so nothing printed by the worker slips past the log
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = os.dup(1), os.dup(2)
+    with open(log_path, 'w') as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            check_required_tools()
+            ok = run_batch_stages(Workspace(pakc_file, output_base_dir), stage, convert, key, key_file, key_num, stream, jobs)
+        except Exception as e:
+            print(f"Error processing {pakc_file}: {e}")
+            ok = False
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            os.close(saved_fds[0])
+            os.close(saved_fds[1])
+    
+    return ok, time.perf_counter() - start, log_path
+
+def batch_process(pattern, output_dir, stage="all", convert=(), key=None, key_file=None, key_num=None, stream=False, processes=None, cache_args=None, jobs=1):
+    """Run every .pakc in a directory/glob through the pipeline in parallel, one scratch dir per archive"""
+    pakc_files = find_pakc_files(pattern)
+    if not pakc_files:
+        print(f"Error: no .pakc files found in {pattern}")
+        return False
+    
+    archives = []
+    for pakc_file in pakc_files:
+        # a built-in key that actually decrypts the header wins, the -k/-kf/-n ones are for everything else
+        archive_key_num = pakc_crypt.detect_key_num_for_file(pakc_file)
+        if archive_key_num is not None:
+            archive_keys = (None, None, archive_key_num)
+        elif key or key_file or key_num:
+            archive_keys = (key, key_file, key_num)
+        else:
+            print(f"Skipping {pakc_file}: none of the built-in keys fit it, pass one with -k, -kf or -n")
+            continue
+        output_base_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(pakc_file))[0])
+        archives.append((pakc_file, output_base_dir, archive_keys))
+    
+    # biggest archives first so they don't end up being the tail
+    archives.sort(key=lambda archive: os.path.getsize(archive[0]), reverse=True)
+    
+    print(f"Processing {len(archives)} archives ({stage})...")
+    start = time.perf_counter()
+    results = {}
+    # every worker opens the same conversion cache, entries are written atomically so they can share it
+    cache_args = cache_args or (None, DEFAULT_MAX_BYTES, False, False)
+    with ProcessPoolExecutor(max_workers=processes, initializer=configure_cache, initargs=cache_args) as pool:
+        futures = {
+            pool.submit(batch_worker, pakc_file, output_base_dir, stage, convert, *archive_keys, stream, jobs): pakc_file
+            for pakc_file, output_base_dir, archive_keys in archives
+        }
+        for future in as_completed(futures):
+            pakc_file = futures[future]
+            try:
+                results[pakc_file] = future.result()
+            except Exception as e:
+                results[pakc_file] = (False, 0.0, str(e))
+            ok, seconds, log_path = results[pakc_file]
+            print(f"  {'done' if ok else 'FAILED'}: {os.path.basename(pakc_file)} ({seconds:.1f}s)")
+    
+    print("\nBatch summary:")
+    for pakc_file, _, _ in archives:
+        ok, seconds, log_path = results[pakc_file]
+        print(f"  {'OK    ' if ok else 'FAILED'} {os.path.basename(pakc_file):<20} {seconds:7.1f}s  log: {log_path}")
+    failed = sum(1 for ok, _, _ in results.values() if not ok)
+    print(f"{len(results) - failed}/{len(results)} archives processed in {time.perf_counter() - start:.1f}s")
+    
+    return failed == 0 and len(archives) == len(pakc_files)
+
 def main():
     parser = argparse.ArgumentParser(description='Snakes asset modding toolchain')
-    parser.add_argument('input_file', help='Path to the input .pakc file')
+    parser.add_argument('input_file', help='Path to the input .pakc file (a directory or glob with --batch)')
     parser.add_argument('output_dir', help='Directory for output files')
     parser.add_argument('-k', '--key', help='Encryption/decryption key (string)')
     parser.add_argument('-kf', '--key-file', help='Read key from file')
     parser.add_argument('-n', '--key-num', type=int, choices=range(1, 6), 
                         help='Use predefined key number (1-5)')
+    parser.add_argument('-a', '--auto-key', action='store_true',
+                        help='Find the right predefined key by trial-decrypting the start of the .pakc (default when no key is given)')
+    parser.add_argument('-s', '--stream', action='store_true',
+                        help='Keep the intermediate .pak/.dat in memory, only the extracted assets and the final .pakc touch the disk')
+    parser.add_argument('-w', '--watch', action='store_true',
+                        help='Instead of waiting for Enter, keep rebuilding the .pakc whenever the extracted/converted files change')
+    parser.add_argument('-b', '--batch', action='store_true',
+                        help='Process every .pakc in a directory/glob in parallel, without any prompts')
+    parser.add_argument('--stage', choices=['extract', 'build', 'all'], default='all',
+                        help='Batch stage: extract (and convert), build (back-convert and repack) or both (default: all)')
+    parser.add_argument('--convert', default='',
+                        help='Batch conversions to do after extracting, comma separated from spt,bix,adp')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help='Number of archives processed at once in batch mode (default: number of cores)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of files converted at once (default: number of cores, or 1 per archive in batch mode)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Where converted SPT/BIX/ADP files are kept between runs (default: conversion_cache next to the scripts)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES >> 20,
+                        help='Conversion cache size limit in MB, least recently used files get dropped first (default: %(default)s)')
+    parser.add_argument('--cache-link', action='store_true',
+                        help='Hardlink cached files instead of copying them (editing one in place changes the other copies too)')
+    parser.add_argument('--no-cache', action='store_true', help='Always convert everything from scratch')
     
     args = parser.parse_args()
 
     if not check_required_tools():
         return
     
+    cache_args = (args.cache_dir, args.cache_size << 20, args.cache_link, not args.no_cache)
+    configure_cache(*cache_args)
+    
+    if args.batch:
+        convert = [c.strip().lower() for c in args.convert.split(',') if c.strip()]
+        if batch_process(args.input_file, args.output_dir, args.stage, convert, args.key, args.key_file, args.key_num, args.stream, args.processes, cache_args, args.jobs or 1):
+            print("Processed successfully!")
+        else:
+            print("it didn't go as planned.")
+        return
+    
     if not os.path.isfile(args.input_file):
         print(f"Error: The input file {args.input_file} does not exist")
         return
@@ -462,7 +894,15 @@ def main():
         print("Error: The input file should have the .pakc extension")
         return
     
-    if process_pakc(args.input_file, args.output_dir, args.key, args.key_file, args.key_num):
+    if args.auto_key or not (args.key or args.key_file or args.key_num):
+        args.key_num = pakc_crypt.detect_key_num_for_file(args.input_file)
+        if args.key_num is None:
+            print("Error: none of the predefined keys fit this .pakc, pass one with -k or -kf")
+            return
+        args.key, args.key_file = None, None
+        print(f"Detected predefined key #{args.key_num}: {pakc_crypt.PREDEFINED_KEYS[args.key_num][0]}")
+    
+    if process_pakc(args.input_file, args.output_dir, args.key, args.key_file, args.key_num, args.stream, args.watch, args.jobs or os.cpu_count() or 1):
         print("Processed successfully!")
     else:
         print("it didn't go as planned.")
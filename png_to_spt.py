@@ -2,8 +2,122 @@ import numpy as np
 from PIL import Image
 import os
 import argparse
+import json
 from collections import defaultdict
 
+# sprite sheets written by spt_to_png_3 --atlas, name.atlas.png with its layout in name.atlas.json
+ATLAS_SUFFIX = ".atlas"
+
+def paletted_frames(images: list, palette_size: int):
+    """
+    Take the palette and index planes straight out of "P" mode images, if they all share one that fits
+    :return: (palette as RGBA tuples, list of index arrays) or None if the images have to go through RGBA
+    """
+    if any(img.mode != "P" for img in images):
+        return None
+
+    def palette_of(img):
+        # quantize() and friends keep the alpha in the palette itself, png files keep it in tRNS
+        if img.palette is not None and img.palette.mode == "RGBA":
+            return img.getpalette("RGBA"), 4, img.info.get("transparency")
+        return img.getpalette("RGB"), 3, img.info.get("transparency")
+
+    colors, channels, transparency = palette_of(images[0])
+    for img in images[1:]:
+        if palette_of(img) != (colors, channels, transparency):
+            return None
+
+    colors = np.array(colors, dtype=np.uint8).reshape(-1, channels)
+    rgb = colors[:, :3]
+    alpha = colors[:, 3].copy() if channels == 4 else np.full(len(rgb), 255, dtype=np.uint8)
+    if isinstance(transparency, bytes):
+        # tRNS has the alpha of the first few entries, the rest are opaque
+        alpha[:len(transparency)] = np.frombuffer(transparency[:len(rgb)], dtype=np.uint8)
+    elif isinstance(transparency, int) and transparency < len(rgb):
+        alpha[transparency] = 0
+
+    frames = [np.asarray(img).ravel() for img in images]
+    used = max(int(frame.max()) for frame in frames) + 1
+    if used > len(rgb) or used > palette_size:
+        return None
+
+    # a palette that's too long for the .spt (like the usual 256 entry one) gets cut after the last used color, otherwise it's kept as it is so the indices stay the same
+    color_count = len(rgb) if len(rgb) <= palette_size else used
+    palette = [tuple(color) for color in np.column_stack([rgb, alpha])[:color_count].tolist()]
+    return palette, frames
+
+def ranked_colors(images_rgba: list):
+    """
+    Every color used in the images, most used first (ties go to whichever shows up first)
+    :return: (colors as an (N, 4) RGBA array, rank of every pixel's color, for all the images back to back)
+    """
+    # the .spt only keeps 4 bits per channel, so colors that only differ below that are the same color
+    pixels = np.concatenate([np.asarray(img, dtype=np.uint8).reshape(-1, 4) for img in images_rgba]) & 0xF0
+    # one uint32 per pixel so np.unique can work on plain numbers
+    packed = pixels.view('<u4').ravel()
+    colors, first_seen, inverse, counts = np.unique(packed, return_index=True, return_inverse=True, return_counts=True)
+
+    order = np.lexsort((first_seen, -counts))
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    return colors[order].view(np.uint8).reshape(-1, 4), ranks[inverse.ravel()]
+
+def nearest_colors(colors, palette, block: int = 4096):
+    """Index of the closest palette color (squared RGBA distance, first one on ties) for every color"""
+    palette = palette.astype(np.int32)
+    nearest = np.empty(len(colors), dtype=np.int64)
+    # a block of colors against the whole palette at once, keeps the distance matrix at a few MB
+    for start in range(0, len(colors), block):
+        diff = colors[start:start+block, None, :].astype(np.int32) - palette[None, :, :]
+        nearest[start:start+block] = np.einsum('ijk,ijk->ij', diff, diff).argmin(axis=1)
+    return nearest
+
+# longest run a single token gets, longer ones are split up
+MAX_RUN_LENGTH = 16383
+
+def encode_rle(pixels, color_count: int):
+    """
+    RLE encode one frame of palette indices, the whole run list at once
+    :param color_count: Palette size, 16 or less allows the short inline runs
+    :return: Encoded bytes
+    """
+    pixels = np.asarray(pixels, dtype=np.int64).ravel()
+    n = len(pixels)
+    if n == 0:
+        return b''
+
+    # where every run starts, and how long it is
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(pixels)) + 1))
+    lengths = np.diff(np.append(starts, n))
+    values = pixels[starts]
+
+    # runs past the max get split into max length pieces plus whatever is left
+    pieces = -(-lengths // MAX_RUN_LENGTH)
+    if (pieces > 1).any():
+        run_of_piece = np.repeat(np.arange(len(lengths)), pieces)
+        piece_no = np.arange(len(run_of_piece)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        is_last = piece_no == pieces[run_of_piece] - 1
+        lengths = np.where(is_last, lengths[run_of_piece] - MAX_RUN_LENGTH * piece_no, MAX_RUN_LENGTH)
+        values = values[run_of_piece]
+
+    # just a color that's 1 in length, 4-bit (3-bit, really) rle, or the normal rle for long runs/too many colors
+    single = lengths == 1
+    inline = ~single & (lengths <= 7) & (color_count <= 16)
+    normal = ~single & ~inline
+    extended = normal & (lengths > 127)
+
+    token_sizes = 1 + normal + extended
+    token_at = np.cumsum(token_sizes) - token_sizes
+    rle_data = np.empty(int(token_sizes.sum()), dtype=np.uint8)
+
+    rle_data[token_at] = np.where(single, values & 0x7F,
+                         np.where(inline, 0x80 | ((lengths & 0x7) << 4) | (values & 0xF),
+                                  0x80 | (values & 0x7F)))
+    # the length byte, with the top bit set when the high part follows
+    rle_data[token_at[normal] + 1] = np.where(extended, (lengths % 128) | 0x80, lengths & 0x7F)[normal]
+    rle_data[token_at[extended] + 2] = lengths[extended] // 128
+    return rle_data.tobytes()
+
 def create_spt_file(output_path: str, images: list, palette_size: int = 255, x_offset = 0, y_offset = 0):
     """
     Create an .spt file from a list of PIL Images
@@ -22,34 +136,29 @@ def create_spt_file(output_path: str, images: list, palette_size: int = 255, x_o
         if img.size != (width, height):
             raise ValueError("All images must be the same dimensions")
     
-    images_rgba = [img.convert("RGBA") for img in images]
-    
-    all_pixels = []
-    for img in images_rgba:
-        all_pixels.extend(img.getdata())
-
-    color_counts = defaultdict(int)
-    for pixel in all_pixels:
-        color_counts[pixel] += 1
+    # already paletted images keep their own palette and indices, no searching needed
+    paletted = paletted_frames(images, palette_size)
+    if paletted is not None:
+        palette, frame_indices = paletted
+    else:
+        images_rgba = [img.convert("RGBA") for img in images]
+        sorted_colors, pixel_ranks = ranked_colors(images_rgba)
 
-    #just in case you add a ton of random colors to a sequence of animated images
-    sorted_colors = sorted(color_counts.items(), key=lambda x: x[1], reverse=True)
+        #just in case you add a ton of random colors to a sequence of animated images
+        if len(sorted_colors) > palette_size:
+            print(f"Cutting down the pallette from {len(sorted_colors)} colors to {palette_size} colors")
 
-    if len(sorted_colors) > palette_size:
-        print(f"Cutting down the pallette from {len(sorted_colors)} colors to {palette_size} colors")
+        palette = sorted_colors[:palette_size]
 
-    palette = [color[0] for color in sorted_colors[:palette_size]]
+        # colors that made it into the palette are their own rank, the rest get the closest one that did
+        color_to_index = np.arange(len(sorted_colors))
+        color_to_index[palette_size:] = nearest_colors(sorted_colors[palette_size:], palette)
+        frame_indices = np.split(color_to_index[pixel_ranks], len(images_rgba))
     
-    color_table = bytearray()
-    for color in palette:
-        r, g, b, a = color
-        argb = (
-            ((a >> 4) & 0xF) << 12 | 
-            ((r >> 4) & 0xF) << 8 | 
-            ((g >> 4) & 0xF) << 4 | 
-            ((b >> 4) & 0xF)
-        )
-        color_table.extend(argb.to_bytes(2, byteorder='big'))
+    # every color goes in as a big-endian ARGB4444 word
+    colors = np.array(palette, dtype=np.uint16).reshape(-1, 4) >> 4
+    argb = (colors[:, 3] << 12) | (colors[:, 0] << 8) | (colors[:, 1] << 4) | colors[:, 2]
+    color_table = argb.astype('>u2').tobytes()
     
     # Determine .spt type (2 for single image, 6 for multiple)
     spt_type = 2 if len(images) == 1 else 6
@@ -78,52 +187,8 @@ def create_spt_file(output_path: str, images: list, palette_size: int = 255, x_o
     header.extend(color_table)
     
     image_data = bytearray()
-    for img in images_rgba:
-        pixels = []
-        for pixel in img.getdata():
-            try:
-                index = palette.index(pixel)
-            except ValueError:
-                index = min(range(len(palette)), 
-                          key=lambda i: sum((a-b)**2 for a, b in zip(palette[i], pixel)))
-            pixels.append(index)
-        
-        rle_data = bytearray()
-        i = 0
-        n = len(pixels)
-        
-        while i < n:
-            current_val = pixels[i]
-            run_length = 1
-            
-            # get the run length
-            while i + run_length < n and pixels[i + run_length] == current_val and run_length < 16383:
-                run_length += 1
-            
-            if run_length > 1:
-                # encode the rle
-                if run_length <= 7 and len(palette) <= 16:
-                    # 4-bit (3-bit, really) rle
-                    encoded = (0x80 | ((run_length & 0x7) << 4) | (current_val & 0xF))
-                    rle_data.append(encoded)
-                else:
-                    # use normal rle if its too long or too many colors are there
-                    rle_data.append(0x80 | (current_val & 0x7F))
-                    
-                    if run_length <= 127:
-                        rle_data.append(run_length & 0x7F)
-                    else:
-                        # long run length
-                        high = (run_length // 128)
-                        low = run_length % 128
-                        rle_data.append(low | 0x80)
-                        rle_data.append(high)
-            else:
-                # just a color that's 1 in length
-                rle_data.append(current_val & 0x7F)
-            
-            i += run_length
-        
+    for pixels in frame_indices:
+        rle_data = encode_rle(pixels, len(palette))
         image_data.extend(len(rle_data).to_bytes(4, byteorder='big'))
         image_data.extend(rle_data)
     
@@ -131,6 +196,69 @@ def create_spt_file(output_path: str, images: list, palette_size: int = 255, x_o
         f.write(header)
         f.write(image_data)
 
+def read_atlas(png_path: str):
+    """
+    Cut a sprite sheet back into its frames, using the .atlas.json next to it
+    :return: (list of PIL Images, x offset, y offset)
+    """
+    with open(png_path[:-len(".png")] + ".json", 'r') as f:
+        layout = json.load(f)
+
+    sheet = Image.open(png_path)
+    frame_width, frame_height = layout["frame_width"], layout["frame_height"]
+    if sheet.size[0] < layout["columns"] * frame_width or sheet.size[1] < layout["rows"] * frame_height:
+        raise ValueError(f"{png_path} is smaller than the grid in its .atlas.json")
+
+    images = []
+    for i in range(layout["frames"]):
+        left = (i % layout["columns"]) * frame_width
+        top = (i // layout["columns"]) * frame_height
+        images.append(sheet.crop((left, top, left + frame_width, top + frame_height)))
+    return images, layout["x_offset"], layout["y_offset"]
+
+def png_group_name(filename: str):
+    """Name of the .spt a png belongs to, so "image[[1;2]]__frame0.png" and "image[[1;2]]__frame1.png" end up together"""
+    if (filename.count("__frame") > 0):
+        return filename.split("__frame")[0]
+    return filename.replace(".png", "")
+
+def group_png_files(png_files: list):
+    """Group png file names by the .spt they belong to"""
+    file_groups = defaultdict(list)
+    for f in png_files:
+        file_groups[png_group_name(f)].append(f)
+    return file_groups
+
+def convert_png_group(input_dir: str, base_name: str, files: list, output_dir: str):
+    """
+    Convert one group of PNGs (a single image or all the frames of one) into an .spt
+    :return: Path of the created .spt file
+    """
+    files = sorted(files)
+
+    if base_name.endswith(ATLAS_SUFFIX):
+        # all the frames in one sheet, the offsets are in the sidecar instead of the name
+        images, x_offset, y_offset = read_atlas(os.path.join(input_dir, files[0]))
+        output_path = os.path.join(output_dir, base_name[:-len(ATLAS_SUFFIX)] + '.spt')
+        create_spt_file(output_path, images, 255, x_offset, y_offset)
+        print(f"Created {output_path} with {len(images)} images")
+        return output_path
+
+    images = [Image.open(os.path.join(input_dir, f)) for f in files]
+
+    if len(images) == 1:
+        output_path = os.path.join(output_dir, base_name.replace(".png", "") + '.spt')
+        create_spt_file(output_path, images)
+    else:
+        # get the offsets encoded like "[[1;2]]" in the filename. they should be the same for the whole image group or it will split them in two and cause you issues
+        output_path = os.path.join(output_dir, base_name.split("[[")[0] + '.spt')
+        offsets = base_name.split("[[")[1].split("]]")[0].split(";")
+        create_spt_file(output_path, images, 255, int(offsets[0]), int(offsets[1]))
+        
+    
+    print(f"Created {output_path} with {len(images)} images")
+    return output_path
+
 def process_png_to_spt(input_path: str, output_dir: str):
     """
     Process PNG file(s) to SPT format
@@ -140,7 +268,9 @@ def process_png_to_spt(input_path: str, output_dir: str):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    if os.path.isfile(input_path):
+    if os.path.isfile(input_path) and input_path.lower().endswith(ATLAS_SUFFIX + ".png"):
+        convert_png_group(os.path.dirname(input_path), os.path.basename(input_path)[:-len(".png")], [os.path.basename(input_path)], output_dir)
+    elif os.path.isfile(input_path):
         # process single one
         img = Image.open(input_path)
         output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(input_path))[0] + '.spt')
@@ -155,30 +285,8 @@ def process_png_to_spt(input_path: str, output_dir: str):
             print(f"No PNG files found in {input_path}")
             return
         
-        # grouping images
-        file_groups = defaultdict(list)
-        for f in png_files:
-            if (f.count("__frame") > 0):
-                base_name = f.split("__frame")[0]  # so "image[[1;2]]__frame0.png", "image[[1;2]]__frame1.png" and so on
-            else:
-                base_name = f.replace(".png", "")
-            file_groups[base_name].append(f)
-        
-        for base_name, files in file_groups.items():
-            files.sort()
-            images = [Image.open(os.path.join(input_path, f)) for f in files]
-
-            if len(images) == 1:
-                output_path = os.path.join(output_dir, base_name.replace(".png", "") + '.spt')
-                create_spt_file(output_path, images)
-            else:
-                # get the offsets encoded like "[[1;2]]" in the filename. they should be the same for the whole image group or it will split them in two and cause you issues
-                output_path = os.path.join(output_dir, base_name.split("[[")[0] + '.spt')
-                offsets = base_name.split("[[")[1].split("]]")[0].split(";")
-                create_spt_file(output_path, images, 255, int(offsets[0]), int(offsets[1]))
-                
-            
-            print(f"Created {output_path} with {len(images)} images")
+        for base_name, files in group_png_files(png_files).items():
+            convert_png_group(input_path, base_name, files, output_dir)
 
 def main():
     parser = argparse.ArgumentParser(description='Convert PNG images to .spt format')
@@ -1,35 +1,39 @@
-import struct
 import argparse
 import os
 
+from dat_index import DatIndex, ENTRY_SIZE, ENTRY_STRUCT, hash_file, load_manifest, save_manifest
+from unpacker import COPY_BUFFER_SIZE, copy_range, write_all
+
 def get_file_order_from_dat(dat_file):
     """Extract the original file order from a .dat file"""
-    with open(dat_file, 'rb') as f:
-        first_fname = f.read(8)
-        header_len = struct.unpack('<i', first_fname[4:8])[0]
-        f.seek(0)
-        header = f.read(header_len)
-
-        file_order = []
-        for i in range(0, header_len, 32):
-            fname_len = struct.unpack('<i', header[i:i+4])[0]
-            fname_off = struct.unpack('<i', header[i+4:i+8])[0]
-            
-            f.seek(fname_off)
-            data = f.read(fname_len)
-            filename = data.decode('unicode_escape')[:-1]
-            file_order.append(filename)
-            
-        return file_order
-
-
-def repack_thing(input_dir, output_file, reference_dat=None):
-    """Repack a folder back into a .dat, optionally with preserved file order"""
-    files = []
-    for filename in os.listdir(input_dir):
-        filepath = os.path.join(input_dir, filename)
-        if os.path.isfile(filepath):
-            files.append(filename)
+    with DatIndex(dat_file) as index:
+        return index.names()
+
+
+class RepackLayout:
+    def __init__(self, input_dir, names, paths, sizes, mtimes, header, name_table):
+        self.input_dir = input_dir
+        self.names = names
+        self.paths = paths
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.header = header
+        self.name_table = name_table
+
+    def total_size(self):
+        return len(self.header) + len(self.name_table) + sum(self.sizes)
+
+
+def plan_repack(input_dir, reference_dat=None):
+    """Work out the whole .dat layout (header, name table, offsets) from a single scandir pass"""
+    on_disk = {}
+    with os.scandir(input_dir) as it:
+        for dir_entry in it:
+            if dir_entry.is_file():
+                st = dir_entry.stat()
+                on_disk[dir_entry.name] = (dir_entry.path, st.st_size, st.st_mtime_ns)
+
+    files = list(on_disk)
     
     if reference_dat:
         try:
@@ -37,61 +41,128 @@ def repack_thing(input_dir, output_file, reference_dat=None):
         except Exception as e:
             print(f"couldn't read the reference .dat for the file order. {e}")
 
-    header_entries = []
-    current_fname_offset = 32 * len(files)  # Header size
-    current_data_offset = current_fname_offset
-
     for filename in files:
-        filename_encoded = filename.encode('unicode_escape') + b'\x00'
-        current_data_offset += len(filename_encoded)
-    
-    for i, filename in enumerate(files):
-        filename_encoded = filename.encode('unicode_escape') + b'\x00'
-        fname_len = len(filename_encoded)
-        
-        filepath = os.path.join(input_dir, filename)
-        file_size = os.path.getsize(filepath)
-        
+        if filename not in on_disk:
+            raise FileNotFoundError(f"{filename} from the reference .dat is missing in {input_dir}")
+
+    encoded_names = [filename.encode('unicode_escape') + b'\x00' for filename in files]
+    paths = [on_disk[filename][0] for filename in files]
+    sizes = [on_disk[filename][1] for filename in files]
+    mtimes = [on_disk[filename][2] for filename in files]
+
+    header = bytearray(ENTRY_SIZE * len(files))
+    current_fname_offset = len(header)  # Header size
+    current_data_offset = current_fname_offset + sum(len(name) for name in encoded_names)
+
+    for i, (filename_encoded, file_size) in enumerate(zip(encoded_names, sizes)):
         word6 = 0x20 * (i - 1) if i >= 2 else 0
         
         word7 = 0x20 * (i + 1) if i != len(files) - 1 else 0
+
+        # name length, name offset, unknown, content length, content offset, unknown, numbering system (words 6 and 7)
+        ENTRY_STRUCT.pack_into(header, i * ENTRY_SIZE, len(filename_encoded), current_fname_offset, 0,
+                               file_size, current_data_offset, 0, word6, word7)
         
-        entry = struct.pack('<i', fname_len)  # filename length
-        entry += struct.pack('<i', current_fname_offset)  # filename offset
-        entry += struct.pack('<i', 0)  # unknown (padding)
-        entry += struct.pack('<i', file_size)  # file content length
-        entry += struct.pack('<i', current_data_offset)  # file content offset
-        entry += struct.pack('<i', 0)  # unknown (padding)
-        entry += struct.pack('<i', word6)  # numbering system (word 6)
-        entry += struct.pack('<i', word7)  # numbering system (word 7)
-        
-        header_entries.append(entry)
-        
-        current_fname_offset += fname_len
+        current_fname_offset += len(filename_encoded)
         current_data_offset += file_size
-    
-    with open(output_file, 'wb') as out_f:
-        for entry in header_entries:
-            out_f.write(entry)
-        
-        for filename in files:
-            filename_encoded = filename.encode('unicode_escape') + b'\x00'
-            out_f.write(filename_encoded)
+
+    return RepackLayout(input_dir, files, paths, sizes, mtimes, bytes(header), b''.join(encoded_names))
+
+
+def find_unchanged(layout, original, manifest):
+    """
+    Work out which files still hold exactly what was extracted from the original .dat
+    :param original: DatIndex of the original .dat
+    :param manifest: name -> {hash, size, mtime_ns} records from extraction, refreshed in place for files that only got touched
+    :return: name -> DatEntry of the original .dat for every unchanged file
+    """
+    unchanged = {}
+    for filename, filepath, file_size, mtime_ns in zip(layout.names, layout.paths, layout.sizes, layout.mtimes):
+        record = manifest.get(filename)
+        if record is None or filename not in original:
+            continue
+        entry = original[filename]
+        if entry.length != file_size or record["size"] != file_size:
+            continue
+
+        # same size and mtime as right after extraction, trust it without reading it
+        if record["mtime_ns"] != mtime_ns:
+            if hash_file(filepath) != record["hash"]:
+                continue
+            record["mtime_ns"] = mtime_ns
+
+        unchanged[filename] = entry
+    return unchanged
+
+
+def iter_repack_chunks(input_dir, reference_dat=None, layout=None, original=None, manifest=None):
+    """
+    Yield a repacked .dat as chunks (header + name table, then file contents) without writing it anywhere
+    :param original: DatIndex of the original .dat, unchanged entries are taken from it instead of the folder
+    :param manifest: Extraction manifest used to tell which entries are unchanged
+    """
+    if layout is None:
+        layout = plan_repack(input_dir, reference_dat)
+    unchanged = find_unchanged(layout, original, manifest) if original is not None and manifest else {}
+
+    yield layout.header + layout.name_table
+
+    for filename, filepath, file_size in zip(layout.names, layout.paths, layout.sizes):
+        if filename in unchanged:
+            yield original.payload(unchanged[filename])
+            continue
+
+        with open(filepath, 'rb') as in_f:
+            remaining = file_size
+            while remaining:
+                chunk = in_f.read(min(COPY_BUFFER_SIZE, remaining))
+                if not chunk:
+                    raise EOFError(f"{filepath} got shorter while it was being repacked")
+                remaining -= len(chunk)
+                yield chunk
+
+
+def repack_thing(input_dir, output_file, reference_dat=None, original_dat=None, manifest_path=None):
+    """Repack a folder back into a .dat, optionally with preserved file order and reusing unchanged entries of the original .dat"""
+    layout = plan_repack(input_dir, reference_dat)
+    buf = bytearray(COPY_BUFFER_SIZE)
+
+    original = None
+    unchanged = {}
+    if original_dat and manifest_path:
+        original = DatIndex(original_dat)
+        manifest = load_manifest(manifest_path)
+        unchanged = find_unchanged(layout, original, manifest)
+        save_manifest(manifest_path, manifest)
+
+    with open(output_file, 'wb', buffering=0) as out_f:
+        write_all(out_f, memoryview(layout.header + layout.name_table))
         
-        for filename in files:
-            filepath = os.path.join(input_dir, filename)
-            with open(filepath, 'rb') as in_f:
-                out_f.write(in_f.read())
+        for filename, filepath, file_size in zip(layout.names, layout.paths, layout.sizes):
+            if filename in unchanged:
+                write_all(out_f, original.payload(unchanged[filename]))
+                continue
+
+            with open(filepath, 'rb', buffering=0) as in_f:
+                copy_range(in_f, out_f, 0, file_size, buf)
+
+    if original is not None:
+        original.close()
+    return len(unchanged)
 
 def main():
     parser = argparse.ArgumentParser(description='Repack assets into the asset packing file')
     parser.add_argument('input_dir', help='Directory containing files to repack')
     parser.add_argument('output_file', help='Path to the output .dat file')
     parser.add_argument('-r', '--reference', help='Reference .dat file to maintain original file order', default=None)
+    parser.add_argument('-i', '--incremental', metavar='ORIGINAL_DAT', help='Take unchanged entries straight from the original .dat (needs --manifest)', default=None)
+    parser.add_argument('-m', '--manifest', help='Manifest written by unpacker.py -m when the original .dat was extracted', default=None)
     
     args = parser.parse_args()
     
-    repack_thing(args.input_dir, args.output_file, args.reference)
+    reused = repack_thing(args.input_dir, args.output_file, args.reference, args.incremental, args.manifest)
+    if reused:
+        print(f"Reused {reused} unchanged entries from {args.incremental}")
     print(f"Successfully repacked files into {args.output_file}")
 
 if __name__ == '__main__':
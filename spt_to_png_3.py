@@ -3,219 +3,366 @@ from PIL import Image
 from os import listdir
 from os.path import isfile, join, isdir
 import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import csv
+import io
+import json
 import os
+import sys
+
+from dat_index import DatIndex
+import pakc_crypt
+import pak_zlib
+
+# multi-image files exported as one sheet end in .atlas.png, with the layout in a .atlas.json next to it
+ATLAS_SUFFIX = ".atlas"
+
+# columns of the inspect index, frame offsets only go into the JSON one
+INDEX_FIELDS = ["name", "size", "type", "frames", "width", "height", "x_offset", "y_offset", "colors", "frame_lengths", "error"]
 
 class EncodedImage:
     def __init__(self, offset, length):
         self.offset = offset
         self.length = length
 
-def read_spt_file(spt_path_ : str, img_name : str, out_dir : str):
-    print(f"Currently reading {img_name}", end="")
-    data = np.fromfile(spt_path_, dtype='B', count=-1)
-
-    if len(data) == 0:
-        print("its empty")
-        return
-
-    spt_type = int(data[0])
-
-    images_stored = int(data[4])
-    #print(f"likely {images_stored} images detected")
-
-    image_x = int(data[8])
-    image_y = int(data[12])
+class SptHeader:
+    """Everything about an .spt that can be known without decoding a single pixel"""
+    def __init__(self, spt_type, images_stored, width, height, x_offset, y_offset, color_offset, color_count, encoded_images):
+        self.spt_type = spt_type
+        self.images_stored = images_stored
+        self.width = width
+        self.height = height
+        self.x_offset = x_offset
+        self.y_offset = y_offset
+        self.color_offset = color_offset
+        self.color_count = color_count
+        self.encoded_images = encoded_images
+
+def read_spt_header(data):
+    """
+    Parse the header, palette length and chunk-length table of an .spt
+    :param data: The whole .spt as a bytes-like object
+    :return: SptHeader
+    """
+    data = memoryview(data).cast('B')
+    if len(data) < 14:
+        raise ValueError("too short to be an .spt")
+
+    spt_type = data[0]
+    images_stored = data[4]
+    image_x = data[8]
+    image_y = data[12]
 
     color_offset = 13
-
-    color_table = {}
-
-    binner = lambda x: bin(x)[2:]
-    padder = lambda x: str(x).zfill(8)
-    vec_binner = np.vectorize(binner)
-    vec_padder = np.vectorize(padder)
-
-    output_images = []
-
     x_offset = 0
     y_offset = 0
 
     # type 2 are single-image files, type 6 are multi-image... with x and y offsets. lol
-    if spt_type == 2:
-        color_array_len = int(data[color_offset])
-    else:
-        x_offset = int(data[16])
-        y_offset = int(data[20])
+    if spt_type != 2:
+        if len(data) < 22:
+            raise ValueError("too short to be a multi-image .spt")
+        x_offset = data[16]
+        y_offset = data[20]
         color_offset = color_offset + 8
-        color_array_len = int(data[color_offset])
-
-    #print(f"{color_array_len} colors")
-
-    def parse_color(parse_at:int):
-        bytes_two = data[parse_at:parse_at+2]
-        if len(bytes_two) != 2:
-            print("error processing colors")
-            return
-        bytes_two_binned = vec_padder(vec_binner(bytes_two))
-        #this does seem to only ever produce images that have 240 as max values, but it does perfectly match what you see in the emulator (tested by overlaying a screencap of the snakes logo on top of the mainlogo.png), so IDK what to make of it. bump the alpha up by 15 or so if you want fully opaque images. lol
-        tr = int(bytes_two_binned[0][0:4], 2)*16
-        r = int(bytes_two_binned[0][4:8], 2)*16
-        g = int(bytes_two_binned[1][0:4], 2)*16
-        b = int(bytes_two_binned[1][4:8], 2)*16
-        return np.array([r, g, b, tr], dtype=np.uint8)
-
-    #parse the color table
-    def parse_color_chunk(parse_at:int, parse_until:int):
-        color_id = 0
-        i_ = parse_at
-        while i_ < parse_at+parse_until:
-            #print(i_)
-            color_table[color_id] = parse_color(i_)
-            i_ += 2
-            color_id+=1
-
-    parse_color_chunk(color_offset + 1, color_array_len*2)
-
-    #print(color_table)
+    color_array_len = data[color_offset]
 
     init_offset = color_array_len*2 + color_offset + 1
 
-    #print(f"getting compressed chunk length at {init_offset}")
-
     #skip the zeroes in multiimage files. i guess this is a hack but i wrote this half a year ago i dont wanna bother
-    while data[init_offset+3] == 0:
+    while init_offset + 3 < len(data) and data[init_offset+3] == 0:
         init_offset += 4
 
-    def get_chunk_length(at_where:int):
-        #print(f"reading chunk len at {at_where}")
-        chunk_len_word = data[at_where:at_where+4]
-        #print(chunk_len_word)
-        bin_array = vec_binner(chunk_len_word)
-        padded_array = vec_padder(bin_array)
-        chunk_len = int( ''.join(padded_array), 2 )
-        return chunk_len
-
+    encoded_images = []
     current_read_offset = init_offset
+    for i in range(images_stored):
+        if current_read_offset + 4 > len(data):
+            raise ValueError(f"image data ends before frame {i}")
+        chunk_len = int.from_bytes(data[current_read_offset:current_read_offset+4], byteorder='big')
+        encoded_images.append(EncodedImage(current_read_offset+4, chunk_len))
+        current_read_offset += chunk_len + 4
 
-    #overcomplicated yeah but just in case. its specifically here because of the prototype's evolver.spt file
-    def filter_upper_bits(icolor:int, color_count:int):
-        icolor = icolor % 128
-        if color_count < 64:
-            icolor = icolor % 64
-        if color_count < 32:    
-            icolor = icolor % 32
-        if color_count < 16:
-            icolor = icolor % 16
-        return icolor
-
-    def read_image(begin : int, length: int):
-        out_image = np.array([], dtype=np.int8)
-        total_len = 0
-        i_ = begin
-        while i_ < begin + length:
-            current_color = data[i_]
-
-            if (current_color >= 128):
-                if color_array_len <= 16:
-                    #the 4-bit\e-bit rle thingy
-                    inline_rle = int("0b0"+bin(current_color)[3:6], 2)
-                else:
-                    inline_rle = 0
-
-                current_color = filter_upper_bits(current_color, color_array_len)
-                
-                if inline_rle == 0:
-                    i_ += 1
-                    color_length = data[i_]
-
-
-                    if color_length > 127:
-                        i_ += 1
-
-                        #print(f"{color_length} {bin(color_length)} cl {data[i_]} {bin(data[i_])} tr")
-
-                        #extended color length
-                        color_length += 128 * (data[i_] - 1)
-
-                        
-
-                    #print(f'rle compressed color {current_color} with length {color_length}')
-                    total_len += color_length
-                    out_image = np.append(out_image, np.tile(np.array([current_color]), color_length))
-                else:
-                    #print(f'rle inline compressed color {current_color} with length {inline_rle}')
-                    out_image = np.append(out_image, np.tile(np.array([current_color]), inline_rle))
-                    total_len += inline_rle
-                
+    return SptHeader(spt_type, images_stored, image_x, image_y, x_offset, y_offset, color_offset, color_array_len, encoded_images)
+
+#parse the color table, every color is a big-endian ARGB4444 word
+def parse_color_table(data, parse_at:int, color_count:int):
+    words = np.frombuffer(data[parse_at:parse_at + color_count*2], dtype='>u2', count=min(color_count, max(len(data) - parse_at, 0) // 2))
+    if len(words) != color_count:
+        print("error processing colors")
+    table = np.zeros((color_count, 4), dtype=np.uint8)
+    #this does seem to only ever produce images that have 240 as max values, but it does perfectly match what you see in the emulator (tested by overlaying a screencap of the snakes logo on top of the mainlogo.png), so IDK what to make of it. bump the alpha up by 15 or so if you want fully opaque images. lol
+    table[:len(words), 0] = ((words >> 8) & 0xF) << 4  # r
+    table[:len(words), 1] = ((words >> 4) & 0xF) << 4  # g
+    table[:len(words), 2] = (words & 0xF) << 4         # b
+    table[:len(words), 3] = ((words >> 12) & 0xF) << 4 # tr
+    return table
+
+#overcomplicated yeah but just in case. its specifically here because of the prototype's evolver.spt file
+def filter_upper_bits(icolor:int, color_count:int):
+    icolor = icolor % 128
+    if color_count < 64:
+        icolor = icolor % 64
+    if color_count < 32:    
+        icolor = icolor % 32
+    if color_count < 16:
+        icolor = icolor % 16
+    return icolor
+
+def parse_runs(data, begin : int, length: int, color_count : int):
+    #walk the rle stream once and just write down (color, run length) for every token, the pixels come later
+    colors = []
+    runs = []
+    i_ = begin
+    while i_ < begin + length:
+        current_color = data[i_]
+
+        if (current_color >= 128):
+            if color_count <= 16:
+                #the 4-bit\e-bit rle thingy, bits 4-6 of the byte
+                inline_rle = (current_color >> 4) & 0b111
             else:
-                total_len += 1
-                #print(f'normal color {current_color} len 1')
-                out_image = np.append(out_image, np.array([current_color]))
-
-            i_ += 1
-
-        pixel_loss = (image_x * image_y) - total_len
+                inline_rle = 0
 
-        #print(f"got length {total_len} when {int(image_x) * int(image_y)} is intended (probably)")
-        #print(f"x {int(image_x)} y {int(image_y)} color count {color_array_len}")
+            current_color = filter_upper_bits(current_color, color_count)
 
-        #some sanity checks for the rle decoder. it used to explode a lot
+            if inline_rle == 0:
+                i_ += 1
+                color_length = data[i_]
 
-        if pixel_loss > 0:
-            print(f"whered you lose {pixel_loss} pixels huh")
-            out_image = np.concatenate([out_image, np.zeros((pixel_loss))], axis=0)
-
-        if pixel_loss < 0:
-            print(f"whered you GAIN {pixel_loss * -1} pixels huh")
-            out_image = out_image[:(image_x * image_y)]
-
-        output_images.append(out_image)
+                if color_length > 127:
+                    i_ += 1
+                    #extended color length
+                    color_length += 128 * (data[i_] - 1)
 
-    encoded_images = []
+                colors.append(current_color)
+                runs.append(color_length)
+            else:
+                colors.append(current_color)
+                runs.append(inline_rle)
+        else:
+            colors.append(current_color)
+            runs.append(1)
+
+        i_ += 1
+
+    return np.array(colors, dtype=np.uint8), np.array(runs, dtype=np.int64)
+
+def decode_frame(data, enc_i : EncodedImage, image_x : int, image_y : int, color_count : int):
+    """Decode one rle chunk into a flat array of palette indices"""
+    colors, runs = parse_runs(data, enc_i.offset, enc_i.length, color_count)
+    total_len = int(runs.sum())
+
+    pixel_loss = (image_x * image_y) - total_len
+
+    #print(f"got length {total_len} when {int(image_x) * int(image_y)} is intended (probably)")
+    #print(f"x {int(image_x)} y {int(image_y)} color count {color_count}")
+
+    #some sanity checks for the rle decoder. it used to explode a lot
+
+    if pixel_loss > 0:
+        print(f"whered you lose {pixel_loss} pixels huh")
+
+    if pixel_loss < 0:
+        print(f"whered you GAIN {pixel_loss * -1} pixels huh")
+        #drop the runs that end up past the end of the image so np.repeat doesn't build them at all
+        ends = np.cumsum(runs)
+        keep = int(np.searchsorted(ends, image_x * image_y)) + 1
+        colors, runs = colors[:keep], runs[:keep].copy()
+        runs[-1] -= int(ends[keep - 1]) - image_x * image_y
+
+    #lost pixels stay 0
+    out_image = np.zeros(image_x * image_y, dtype=np.uint8)
+    out_image[:min(total_len, image_x * image_y)] = np.repeat(colors, runs)
+    return out_image
+
+class SptFile:
+    """
+    An .spt with only its header and palette parsed, frames get decoded when they're asked for
+    :param source: Path to the .spt, or the whole file as a bytes-like object
+    :param cache_size: How many decoded frames to keep around, least recently used ones go first
+    """
+
+    def __init__(self, source, cache_size=16):
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                source = f.read()
+        self.data = source if isinstance(source, bytes) else bytes(source)
+        self.header = read_spt_header(self.data)
+        self.color_table = parse_color_table(self.data, self.header.color_offset + 1, self.header.color_count)
+        self.cache_size = cache_size
+        self._frames = OrderedDict()
+
+    def __len__(self):
+        return len(self.header.encoded_images)
+
+    @property
+    def width(self):
+        return self.header.width
+
+    @property
+    def height(self):
+        return self.header.height
+
+    def frame_indices(self, i : int):
+        """Palette indices of frame i, shaped (height, width). Read-only, it's the cached copy"""
+        if i in self._frames:
+            self._frames.move_to_end(i)
+            return self._frames[i]
+
+        header = self.header
+        indices = decode_frame(self.data, header.encoded_images[i], header.width, header.height, header.color_count)
+        indices = indices.reshape(header.height, header.width)
+        indices.setflags(write=False)
+
+        if self.cache_size > 0:
+            self._frames[i] = indices
+            if len(self._frames) > self.cache_size:
+                self._frames.popitem(last=False)
+        return indices
+
+    def frame(self, i : int):
+        """Frame i as an RGBA array, shaped (height, width, 4)"""
+        #indices past the end of the palette wrap around
+        return self.color_table[self.frame_indices(i) % self.header.color_count]
+
+    def frames(self):
+        for i in range(len(self)):
+            yield self.frame(i)
+
+    def image(self, i : int, paletted : bool = False):
+        """Frame i as a PIL Image, RGBA or a "P" one that keeps the .spt's own indices and palette"""
+        if not paletted:
+            return Image.fromarray(self.frame(i), 'RGBA')
+        return palette_image(self.frame_indices(i) % self.header.color_count, self.color_table)
+
+def palette_image(indices, color_table):
+    """"P" mode image out of palette indices, the alpha of every color goes into the tRNS chunk"""
+    img = Image.fromarray(np.ascontiguousarray(indices, dtype=np.uint8), 'P')
+    img.putpalette(color_table[:, :3].tobytes(), rawmode='RGB')
+    img.info['transparency'] = color_table[:, 3].tobytes()
+    return img
+
+def atlas_sheet(frames : list):
+    """
+    Lay frames out in a grid, as square as it gets
+    :return: (sheet array, same kind as the frames, columns, rows)
+    """
+    columns = int(np.ceil(np.sqrt(len(frames))))
+    rows = -(-len(frames) // columns)
+    height, width = frames[0].shape[:2]
+    #rgba frames have a channel axis, palette index ones don't
+    channels = frames[0].shape[2:]
+
+    #empty cells at the end stay transparent (or index 0 for paletted ones)
+    grid = np.zeros((rows * columns, height, width) + channels, dtype=np.uint8)
+    grid[:len(frames)] = frames
+    sheet = grid.reshape((rows, columns, height, width) + channels).swapaxes(1, 2).reshape((rows * height, columns * width) + channels)
+    return sheet, columns, rows
+
+def write_atlas(out_dir : str, stem : str, frames : list, x_offset : int, y_offset : int, color_table=None, compress_level : int = 6):
+    """
+    Write the frames of a multi-image .spt as {stem}.atlas.png plus the {stem}.atlas.json sidecar png_to_spt reads back
+    :param color_table: Palette the frames index into, if they're index planes instead of RGBA
+    """
+    sheet, columns, rows = atlas_sheet(frames)
+    height, width = frames[0].shape[:2]
+    sheet_image = Image.fromarray(sheet, 'RGBA') if color_table is None else palette_image(sheet, color_table)
+    sheet_image.save(os.path.join(out_dir, f"{stem}{ATLAS_SUFFIX}.png"), compress_level=compress_level)
+    with open(os.path.join(out_dir, f"{stem}{ATLAS_SUFFIX}.json"), 'w') as f:
+        json.dump({
+            "frames": len(frames),
+            "columns": columns,
+            "rows": rows,
+            "frame_width": width,
+            "frame_height": height,
+            "x_offset": x_offset,
+            "y_offset": y_offset,
+        }, f, indent=1)
+
+def read_spt_file(spt_path_ : str, img_name : str, out_dir : str, atlas : bool = False, paletted : bool = False, compress_level : int = 6):
+    """
+    Convert an .spt into png(s) in out_dir
+    :param atlas: Put all the frames of a multi-image file in one sprite sheet
+    :param paletted: Write "P" mode pngs with the .spt's palette instead of RGBA ones, smaller and the indices survive a round trip
+    :param compress_level: zlib level for the pngs, 0-9
+    """
+    print(f"Currently reading {img_name}", end="")
+    if os.path.getsize(spt_path_) == 0:
+        print("its empty")
+        return
 
-    for i in range(images_stored):
-        chunk_len = get_chunk_length(current_read_offset)
-        #print(f"chunk should be {chunk_len} in length")
-        encoded_images.append(EncodedImage(current_read_offset+4, chunk_len))
-        current_read_offset += chunk_len + 4
+    #every frame gets decoded exactly once here, no point caching them
+    spt = SptFile(spt_path_, cache_size=0)
+    header = spt.header
 
-    #init_offset + 1
-    enc_i : EncodedImage
-    for enc_i in encoded_images:
-        read_image(enc_i.offset, enc_i.length)
+    output_images = []
+    for i in range(len(spt)):
+        if paletted:
+            #indices past the end of the palette wrap around, same as when they get colored in
+            output_images.append(spt.frame_indices(i) % header.color_count)
+        else:
+            output_images.append(spt.frame(i))
         print(f".", end="")
 
-    output_images_colored = []
-
-    #dict_vec_thing = np.vectorize(color_table.__getitem__)
-
-    for i in output_images:
-        colored_img = []
-        for j in i:
-            max_color = max(color_table.keys())
-            j = j % (max_color+1)
-            colored_img.append(color_table[j])
-        colored_img = np.array(colored_img)
-        output_images_colored.append(colored_img)
+    color_table = spt.color_table if paletted else None
+    def save(pixels, output_path):
+        img_ = Image.fromarray(pixels, 'RGBA') if color_table is None else palette_image(pixels, color_table)
+        img_.save(output_path, compress_level=compress_level)
 
-    if len(output_images_colored) == 1:
-        output_path = os.path.join(out_dir, f"{img_name[:-4]}.png")
-        Image.fromarray(output_images_colored[0].reshape(image_y, image_x, 4), 'RGBA').save(output_path)
+    if len(output_images) == 1:
+        save(output_images[0], os.path.join(out_dir, f"{img_name[:-4]}.png"))
+    elif atlas:
+        write_atlas(out_dir, img_name[:-4], output_images, header.x_offset, header.y_offset, color_table, compress_level)
     else:
-        for i, img_ in enumerate(output_images_colored):
-            output_path = os.path.join(out_dir, f"{img_name[:-4]}[[{x_offset};{y_offset}]]__frame{i}.png")
-            Image.fromarray(img_.reshape(image_y, image_x, 4), 'RGBA').save(output_path)
+        for i, img_ in enumerate(output_images):
+            save(img_, os.path.join(out_dir, f"{img_name[:-4]}[[{header.x_offset};{header.y_offset}]]__frame{i}.png"))
     print(" done.")
 
-def process_spt_files(input_path: str, output_dir: str):
+def convert_spt_job(input_file_path : str, filename : str, output_dir : str, options : dict):
+    """Convert one file with its progress output captured, returns (output, error message or None)"""
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            read_spt_file(input_file_path, filename, output_dir, **options)
+    except Exception as e:
+        return out.getvalue(), str(e)
+    return out.getvalue(), None
+
+def convert_spt_jobs(spt_files : list, input_dir : str, output_dir : str, jobs : int, options : dict):
+    """
+    Convert files in a process pool, biggest first, while printing the results in the order of spt_files
+    :param options: Keyword arguments for read_spt_file
+    :return: How many of them failed
+    """
+    sizes = [os.path.getsize(join(input_dir, filename)) for filename in spt_files]
+    order = sorted(range(len(spt_files)), key=lambda i: sizes[i], reverse=True)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {i: pool.submit(convert_spt_job, join(input_dir, spt_files[i]), spt_files[i], output_dir, options) for i in order}
+        for i, filename in enumerate(spt_files):
+            try:
+                output, error = futures[i].result()
+            except Exception as e:
+                # the worker itself died
+                output, error = "", str(e)
+            print(output, end="")
+            if error:
+                print(f"\nerror reading {filename}: {error}")
+                failed += 1
+    return failed
+
+def process_spt_files(input_path: str, output_dir: str, jobs : int = 1, **options):
+    """Convert an .spt or a directory of them, options go to read_spt_file"""
     if not os.path.exists(input_path):
         print(f"no input path named '{input_path}'")
         return
 
     if isdir(input_path):
         # Process directory
-        spt_files = [f for f in listdir(input_path) 
-                    if isfile(join(input_path, f)) and f.lower().endswith('.spt')]
+        spt_files = sorted(f for f in listdir(input_path) 
+                    if isfile(join(input_path, f)) and f.lower().endswith('.spt'))
 
         if not spt_files:
             print(f"no .spt files in input directory named {input_path}")
@@ -223,11 +370,20 @@ def process_spt_files(input_path: str, output_dir: str):
 
         print(f"...found {len(spt_files)} .spt files to process")
 
-        for filename in spt_files:
-            input_file_path = join(input_path, filename)
-            read_spt_file(input_file_path, filename, output_dir)
+        if jobs > 1 and len(spt_files) > 1:
+            failed = convert_spt_jobs(spt_files, input_path, output_dir, jobs, options)
+        else:
+            failed = 0
+            for filename in spt_files:
+                input_file_path = join(input_path, filename)
+                try:
+                    read_spt_file(input_file_path, filename, output_dir, **options)
+                except Exception as e:
+                    # one broken file shouldn't take the rest of the folder with it
+                    print(f"\nerror reading {filename}: {e}")
+                    failed += 1
         
-        print(f"wrote like {len(spt_files)} .pngs to {output_dir}")
+        print(f"wrote like {len(spt_files) - failed} .pngs to {output_dir}" + (f", {failed} files failed" if failed else ""))
     else:
         # Process single file
         if not input_path.lower().endswith('.spt'):
@@ -235,17 +391,101 @@ def process_spt_files(input_path: str, output_dir: str):
             return
             
         filename = os.path.basename(input_path)
-        read_spt_file(input_path, filename, output_dir)
+        read_spt_file(input_path, filename, output_dir, **options)
         print(f"wrote converted file to {output_dir}")
 
+def spt_info(name : str, data):
+    """Index entry for one .spt, straight from its header"""
+    info = {"name": name, "size": len(data)}
+    try:
+        header = read_spt_header(data)
+    except ValueError as e:
+        info["error"] = str(e)
+        return info
+
+    info.update({
+        "type": header.spt_type,
+        "frames": header.images_stored,
+        "width": header.width,
+        "height": header.height,
+        "x_offset": header.x_offset,
+        "y_offset": header.y_offset,
+        "colors": header.color_count,
+        "frame_offsets": [enc_i.offset for enc_i in header.encoded_images],
+        "frame_lengths": [enc_i.length for enc_i in header.encoded_images],
+    })
+    return info
+
+def read_pakc_dat(pakc_file : str):
+    """Decrypt and inflate the .dat out of a .pakc in memory, with whichever built-in key fits"""
+    key_num = pakc_crypt.detect_key_num_for_file(pakc_file)
+    if key_num is None:
+        raise ValueError(f"none of the predefined keys fit {pakc_file}")
+    cipher = pakc_crypt.cipher_for_key_num(key_num)
+    with open(pakc_file, 'rb') as f:
+        _, body = pak_zlib.split_header(cipher.decrypt_chunks(pak_zlib.read_file_chunks(f)))
+        return b''.join(pak_zlib.inflate_chunks(body))
+
+def inspect_spt_files(input_path : str):
+    """Header info for every .spt in a directory, a .dat or .pakc archive, or a single .spt file"""
+    infos = []
+    if isdir(input_path):
+        for filename in sorted(listdir(input_path)):
+            if filename.lower().endswith('.spt') and isfile(join(input_path, filename)):
+                with open(join(input_path, filename), 'rb') as f:
+                    infos.append(spt_info(filename, f.read()))
+    elif input_path.lower().endswith(('.dat', '.pakc')):
+        source = read_pakc_dat(input_path) if input_path.lower().endswith('.pakc') else input_path
+        with DatIndex(source) as index:
+            for entry in index:
+                if entry.name.lower().endswith('.spt'):
+                    infos.append(spt_info(entry.name, index.payload(entry)))
+    else:
+        with open(input_path, 'rb') as f:
+            infos.append(spt_info(os.path.basename(input_path), f.read()))
+    return infos
+
+def write_spt_index(infos : list, output_path=None, index_format="json"):
+    """Write the inspect index as JSON or CSV, to stdout if there's no output path"""
+    out_f = open(output_path, 'w', newline='') if output_path else sys.stdout
+    try:
+        if index_format == "csv":
+            writer = csv.DictWriter(out_f, fieldnames=INDEX_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for info in infos:
+                row = dict(info)
+                if "frame_lengths" in row:
+                    row["frame_lengths"] = ";".join(str(length) for length in row["frame_lengths"])
+                writer.writerow(row)
+        else:
+            json.dump(infos, out_f, indent=1)
+            out_f.write("\n")
+    finally:
+        if output_path:
+            out_f.close()
+
 def main():
     parser = argparse.ArgumentParser(description='Convert .spt images to .png ones')
-    parser.add_argument('input_path', help='Input file or directory containing .spt files')
-    parser.add_argument('-o', '--output', help='Output directory (default: input_dir + "_output" for directories or same directory as input file)')
+    parser.add_argument('input_path', help='Input file or directory containing .spt files (or a .dat/.pakc with --inspect)')
+    parser.add_argument('-o', '--output', help='Output directory (default: input_dir + "_output" for directories or same directory as input file), or the index file with --inspect (default: stdout)')
+    parser.add_argument('--inspect', action='store_true', help="Don't decode anything, just write an index of every sprite's size, frames, offsets and palette size")
+    parser.add_argument('--format', choices=['json', 'csv'], help='Index format for --inspect (default: from the output extension, otherwise json)')
+    parser.add_argument('--atlas', action='store_true', help='Write the frames of multi-image files as one sprite sheet (name.atlas.png + name.atlas.json) instead of a png per frame')
+    parser.add_argument('-p', '--paletted', action='store_true', help='Write paletted ("P" mode) pngs with the .spt\'s own colors, smaller and faster, and converting them back keeps the exact same colors')
+    parser.add_argument('--compress-level', type=int, default=6, choices=range(10), metavar='0-9', help='PNG compression level, lower is faster but bigger (default: 6)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='How many files to convert at once, biggest first (default: 1)')
     
     args = parser.parse_args()
     
     input_path = args.input_path
+    if args.inspect:
+        if not os.path.exists(input_path):
+            print(f"no input path named '{input_path}'")
+            return
+        index_format = args.format or ("csv" if args.output and args.output.lower().endswith('.csv') else "json")
+        write_spt_index(inspect_spt_files(input_path), args.output, index_format)
+        return
+    
     if isdir(input_path):
         output_dir = args.output if args.output else f"{input_path}_output"
     else:
@@ -254,7 +494,7 @@ def main():
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    process_spt_files(input_path, output_dir)
+    process_spt_files(input_path, output_dir, max(1, args.jobs), atlas=args.atlas, paletted=args.paletted, compress_level=args.compress_level)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
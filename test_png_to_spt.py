@@ -0,0 +1,36 @@
+import numpy as np
+from PIL import Image
+
+import png_to_spt
+import spt_to_png_3
+
+def sprite_rgba():
+    """Opaque red on top, fully transparent at the bottom and a half transparent stripe"""
+    pixels = np.zeros((8, 8, 4), dtype=np.uint8)
+    pixels[:4] = (255, 0, 0, 255)
+    pixels[4:6] = (0, 0, 0, 0)
+    pixels[6:] = (0, 128, 255, 128)
+    return pixels
+
+def round_trip(tmp_path, images):
+    spt_path = str(tmp_path / "sprite.spt")
+    png_to_spt.create_spt_file(spt_path, images)
+    return spt_to_png_3.SptFile(spt_path).frame(0)
+
+def test_rgba_palette_keeps_alpha(tmp_path):
+    # quantize() on an RGBA image gives a "P" image with the alpha in the palette and nothing in info
+    pixels = sprite_rgba()
+    img = Image.fromarray(pixels, 'RGBA').quantize()
+    assert img.palette.mode == "RGBA" and "transparency" not in img.info
+
+    assert (round_trip(tmp_path, [img]) == (pixels & 0xF0)).all()
+
+def test_trns_palette_keeps_alpha(tmp_path):
+    pixels = sprite_rgba()
+    img = Image.fromarray(pixels, 'RGBA').quantize()
+    # a paletted png keeps the alpha in tRNS instead
+    img.save(tmp_path / "sprite.png")
+    img = Image.open(tmp_path / "sprite.png")
+    assert img.palette.mode == "RGB" and "transparency" in img.info
+
+    assert (round_trip(tmp_path, [img]) == (pixels & 0xF0)).all()
@@ -1,59 +1,107 @@
-import struct
 import argparse
 import os
 
-def unpack_thing(file_path, out_dir = None):
+from dat_index import DatIndex, content_hash, save_manifest
+
+# size of the reusable buffer for when the kernel can't copy the ranges for us
+COPY_BUFFER_SIZE = 1 << 20
+
+def write_all(out_f, view):
+    while view:
+        written = out_f.write(view)
+        view = view[written:]
+
+def copy_range(src_f, dst_f, offset, length, buf=None):
+    """Copy length bytes at offset of src_f into dst_f (unbuffered), in the kernel when it supports it"""
+    done = 0
+
+    # copy_file_range/sendfile aren't everywhere (and sendfile only takes sockets on some systems)
+    for kernel_copy in ('copy_file_range', 'sendfile'):
+        if done == length or not hasattr(os, kernel_copy):
+            continue
+        try:
+            while done < length:
+                if kernel_copy == 'copy_file_range':
+                    copied = os.copy_file_range(src_f.fileno(), dst_f.fileno(), length - done, offset + done)
+                else:
+                    copied = os.sendfile(dst_f.fileno(), src_f.fileno(), offset + done, length - done)
+                if copied == 0:
+                    break
+                done += copied
+        except OSError:
+            pass
+
+    if done == length:
+        return
+
+    if buf is None:
+        buf = bytearray(min(COPY_BUFFER_SIZE, length - done))
+    view = memoryview(buf)
+    src_f.seek(offset + done)
+    while done < length:
+        got = src_f.readinto(view[:min(len(view), length - done)])
+        if not got:
+            raise EOFError(f"entry runs past the end of the file ({done} of {length} bytes)")
+        write_all(dst_f, view[:got])
+        done += got
+
+def extract_entries(index, out_dir, src_f=None, verbose=True, manifest=None):
+    """
+    Write every entry of a DatIndex to out_dir, copying from src_f if it's given or from the index's buffer otherwise
+    :param manifest: Optional dict that gets a {hash, size, mtime_ns} record for every written entry
+    """
+    buf = bytearray(COPY_BUFFER_SIZE) if src_f is not None else None
+
+    for entry in index:
+        out_path = os.path.join(out_dir, entry.name)
+        with open(out_path, 'wb', buffering=0) as thing_file:
+            if src_f is None:
+                write_all(thing_file, index.payload(entry))
+            else:
+                copy_range(src_f, thing_file, entry.offset, entry.length, buf)
+        
+        if manifest is not None:
+            st = os.stat(out_path)
+            manifest[entry.name] = {
+                "hash": content_hash(index.payload(entry)),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+            }
+        if verbose:
+            print(f'{entry.name} written')
+
+def unpack_thing(file_path, out_dir = None, verbose=True, manifest_path=None):
 
     if out_dir is None:
         out_dir = os.path.dirname(file_path) or '.'
 
-    with open(file_path, 'rb') as f:
-        first_fname = f.read(8)
-        header_len = struct.unpack('<i', first_fname[4:8])[0]
-        print(header_len)
-        f.seek(0)
-        header = f.read(header_len)
-
-        header_entry = {
-            "fname_len": 0,
-            "fname_off": 0,
-            "file_content_len": 0,
-            "file_content_off": 0,
-        }
-
-        offsets = []
-        for i in range(0, header_len, 32):
-            new_entry = header_entry.copy()
-
-            new_entry["fname_len"] = struct.unpack('<i', header[i:i+4])[0]
-            new_entry["fname_off"] = struct.unpack('<i', header[i+4:i+8])[0]
-            new_entry["file_content_len"] = struct.unpack('<i', header[i+12:i+16])[0]
-            new_entry["file_content_off"] = struct.unpack('<i', header[i+16:i+20])[0]
-            offsets.append(new_entry)
-        
-        for i, offset in enumerate(offsets):
-            f.seek(offset["fname_off"])
-            data = f.read(offset["fname_len"])
+    manifest = {} if manifest_path else None
+
+    with DatIndex(file_path) as index, open(file_path, 'rb', buffering=0) as src_f:
+        if verbose:
+            print(index.header_len)
+        extract_entries(index, out_dir, src_f, verbose, manifest)
 
-            fl_name = data.decode('unicode_escape')[:-1]
+    if manifest_path:
+        save_manifest(manifest_path, manifest)
 
-            print(fl_name)
-            
-            f.seek(offset["file_content_off"])
-            data = f.read(offset["file_content_len"])
-            
-            with open(f'{out_dir}\\{fl_name}', 'wb') as thing_file:
-                thing_file.write(data)
-            print(f'{fl_name} written')
+def unpack_bytes(data, out_dir, verbose=True, manifest_path=None):
+    """Unpack a .dat that's already in memory, only the entries get written to disk"""
+    manifest = {} if manifest_path else None
+    extract_entries(DatIndex(data), out_dir, verbose=verbose, manifest=manifest)
+    if manifest_path:
+        save_manifest(manifest_path, manifest)
 
 def main():
     parser = argparse.ArgumentParser(description='Unpack assets from the asset packing file')
     parser.add_argument('input_file', help='Path to the input file to unpack')
     parser.add_argument('-o', '--output', help='Output directory (default: same as input file)')
+    parser.add_argument('-q', '--quiet', action='store_true', help="Don't print every file that gets written")
+    parser.add_argument('-m', '--manifest', help='Write a JSON manifest with a content hash of every entry, for incremental repacking')
     
     args = parser.parse_args()
     
-    unpack_thing(args.input_file, args.output)
+    unpack_thing(args.input_file, args.output, not args.quiet, args.manifest)
 
 if __name__ == '__main__':
     main()